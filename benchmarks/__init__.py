@@ -0,0 +1 @@
+"""Command-line benchmarks for the detection hot path."""
@@ -0,0 +1,79 @@
+"""Bytes allocated per worker frame: legacy RGB-copy path vs. zero-copy BGRA path.
+
+Run from the repository root:  python -m benchmarks.alloc_per_frame [--size 300] [--frames 200]
+
+Peak traced allocation (numpy/OpenCV buffers included) is measured per frame with
+tracemalloc, using synthetic frames shaped like an mss ScreenShot.
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from colorbot import ColorMatcher, Target
+
+from .common import measure_peak_alloc, wait_for_table
+
+TARGET_COLORS = [(204, 204, 204), (38, 120, 122)]
+OVERLAY_COLORS = [(255, 0, 0), (0, 0, 255)]
+
+
+class SyntheticShot:
+    """Minimal stand-in for ``mss.screenshot.ScreenShot``: BGRA ``raw`` bytes plus the array interface."""
+
+    def __init__(self, width, height, seed=0):
+        rng = np.random.default_rng(seed)
+        bgra = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        bgra[: height // 3, :, :3] = TARGET_COLORS[0][::-1]
+        self.raw = bytearray(bgra.tobytes())
+        self.width, self.height = width, height
+        self.__array_interface__ = {"version": 3, "shape": (height, width, 4), "typestr": "|u1", "data": self.raw}
+
+
+def legacy_frame(shot, matcher, tolerance):
+    """The pre-BGRA worker: two copies to get RGB, a UI copy, per-target float LAB masks and an overlay every tick."""
+    area_np_rgb = cv2.cvtColor(np.array(shot), cv2.COLOR_BGRA2RGB)
+    capture_img_for_ui = area_np_rgb.copy()
+    image_lab = cv2.cvtColor(area_np_rgb, cv2.COLOR_RGB2LAB)
+    masks = []
+    for target in matcher.targets:
+        delta_lab_sq = np.sum((image_lab.astype(np.float32) - np.array(target.lab, dtype=np.float32)) ** 2, axis=2)
+        masks.append((delta_lab_sq <= float(tolerance) ** 2).astype(np.uint8) * 255)
+    overlay = area_np_rgb.copy(); overlay[masks[0] == 255] = OVERLAY_COLORS[0]; overlay[masks[1] == 255] = OVERLAY_COLORS[1]
+    return capture_img_for_ui, overlay
+
+
+def bgra_frame(shot, matcher, publish):
+    """The current worker: match on a view over ``raw``; RGB/overlay only for frames the UI will show."""
+    area_np_bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+    match = matcher.match_bgra(area_np_bgra)
+    if publish:
+        capture_img_for_ui = cv2.cvtColor(area_np_bgra, cv2.COLOR_BGRA2RGB)
+        return capture_img_for_ui, matcher.overlay(capture_img_for_ui, match.labels, OVERLAY_COLORS)
+    return match
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=300, help="capture box size in px")
+    parser.add_argument("--frames", type=int, default=200)
+    parser.add_argument("--tolerance", type=int, default=15)
+    parser.add_argument("--publish-every", type=int, default=20, help="UI frames are materialized once per N ticks")
+    args = parser.parse_args(argv)
+
+    shot = SyntheticShot(args.size, args.size)
+    matcher = ColorMatcher([Target(c, args.tolerance, "LAB") for c in TARGET_COLORS])
+    wait_for_table(matcher)
+
+    rows = [
+        ("legacy (copy + float LAB)", measure_peak_alloc(lambda i: legacy_frame(shot, matcher, args.tolerance), args.frames)),
+        ("bgra view (every tick)", measure_peak_alloc(lambda i: bgra_frame(shot, matcher, False), args.frames)),
+        (f"bgra view (UI 1/{args.publish_every})", measure_peak_alloc(lambda i: bgra_frame(shot, matcher, i % args.publish_every == 0), args.frames)),
+    ]
+    print(f"Peak bytes allocated per frame, {args.size}x{args.size} box, {args.frames} frames:")
+    for name, (mean_peak, max_peak) in rows:
+        print(f"  {name:<28} mean {mean_peak / 1024:10.1f} KiB   max {max_peak / 1024:10.1f} KiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+"""Timing and allocation helpers shared by the benchmark scripts."""
+import time
+import tracemalloc
+
+import numpy as np
+
+
+def measure_latency(fn, iterations, warmup=3):
+    """Per-call latency stats in milliseconds plus calls per second."""
+    for i in range(warmup): fn(i)
+    times = np.empty(iterations)
+    for i in range(iterations):
+        start = time.perf_counter()
+        fn(i)
+        times[i] = time.perf_counter() - start
+    times *= 1000
+    return {"p50_ms": float(np.percentile(times, 50)), "p99_ms": float(np.percentile(times, 99)), "mean_ms": float(times.mean()),
+            "throughput_per_s": float(1000 / times.mean()) if times.mean() > 0 else float("inf")}
+
+
+def measure_peak_alloc(fn, iterations):
+    """(mean, max) peak bytes traced per call, numpy/OpenCV buffers included."""
+    peaks = []
+    tracemalloc.start()
+    try:
+        for i in range(iterations):
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            result = fn(i)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+            del result
+    finally:
+        tracemalloc.stop()
+    return float(np.mean(peaks)), int(np.max(peaks))
+
+
+def wait_for_table(matcher, timeout=60.0):
+    deadline = time.perf_counter() + timeout
+    while matcher.use_table and matcher.targets and not matcher.table.is_ready():
+        if time.perf_counter() > deadline: raise TimeoutError("Match table build timed out")
+        time.sleep(0.02)
@@ -0,0 +1,70 @@
+"""Dominant-color backends compared: k-means (full / streaming) vs. LAB histogram peaks.
+
+Run from the repository root:  python -m benchmarks.dominant_colors [--sizes 64 300 600] [--frames 30]
+
+Frames are synthetic: a few flat color bands plus per-frame noise, so the
+reference colors are known. For each backend the mean/p99 time per frame is
+reported, together with how well its top colors match the reference
+(mean ΔE76 to the nearest reference color, and the share of the frame its
+reported colors cover).
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from colorbot.dominant import DominantColorAnalyzer
+
+REFERENCE_RGB = [(30, 30, 30), (200, 50, 50), (50, 200, 50), (50, 50, 200), (220, 220, 220), (38, 120, 122)]
+
+
+def synthetic_frames(size, frames, noise=8, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.zeros((size, size, 4), dtype=np.uint8)
+    bands = np.array_split(np.arange(size), len(REFERENCE_RGB))
+    for rows, rgb in zip(bands, REFERENCE_RGB): base[rows, :, :3] = rgb[::-1]
+    return [np.clip(base.astype(np.int16) + rng.integers(-noise, noise + 1, base.shape), 0, 255).astype(np.uint8) for _ in range(frames)]
+
+
+def reference_lab():
+    return cv2.cvtColor(np.uint8([REFERENCE_RGB]), cv2.COLOR_RGB2LAB)[0].astype(np.float32)
+
+
+def quality(colors, ref_lab):
+    if not colors: return float("nan"), 0.0
+    labs = np.array([c['lab'] for c in colors], dtype=np.float32)
+    delta_e = np.sqrt(((labs[:, None, :] - ref_lab[None, :, :]) ** 2).sum(axis=2)).min(axis=1)
+    return float(delta_e.mean()), float(sum(c['percentage'] for c in colors))
+
+
+def run(mode, frames, **kwargs):
+    analyzer = DominantColorAnalyzer(mode=mode, **kwargs)
+    times, result = [], []
+    for frame in frames:
+        start = time.perf_counter()
+        result = analyzer.analyze(frame)
+        times.append(time.perf_counter() - start)
+    return np.array(times) * 1000, result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[64, 300, 600])
+    parser.add_argument("--frames", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    ref_lab = reference_lab()
+    backends = [("kmeans full", "full", {}), ("kmeans streaming", "streaming", {}),
+                ("histogram (64 px)", "histogram", {"histogram_resize_width": 64}), ("histogram (full res)", "histogram", {})]
+    print(f"{'size':>5}  {'backend':<22} {'mean ms':>8} {'p99 ms':>8} {'colors':>6} {'ΔE to ref':>9} {'covered %':>9}")
+    for size in args.sizes:
+        frames = synthetic_frames(size, args.frames)
+        for name, mode, kwargs in backends:
+            times, colors = run(mode, frames, **kwargs)
+            delta_e, covered = quality(colors, ref_lab)
+            print(f"{size:>5}  {name:<22} {times.mean():8.2f} {np.percentile(times, 99):8.2f} {len(colors):>6} {delta_e:9.2f} {covered:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
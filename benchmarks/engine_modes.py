@@ -0,0 +1,61 @@
+"""Detection loop on a thread vs. in a child process, with and without a busy GUI thread.
+
+Run from the repository root:  python -m benchmarks.engine_modes [--seconds 3] [--box 300]
+
+The engine runs on a synthetic capture with its previews and dominant colors
+enabled. The calling thread plays the GUI: it drains the result slots every
+50 ms and, with ``--gui-load``, burns that fraction of each interval in pure
+Python the way Tk image and Treeview updates do. For each mode the script
+prints the achieved tick rate, tick p50/p99/max and the previews received;
+only the thread mode should degrade under GUI load.
+"""
+import argparse
+import collections
+import time
+
+from colorbot import LatestSlots, WorkerConfig, start_engine
+from colorbot.perf import TICK_STAGE
+
+COLORS = ((204, 204, 204), (38, 120, 122))
+POLL_INTERVAL = 0.05
+
+
+def busy(seconds):
+    end, x = time.perf_counter() + seconds, 0
+    while time.perf_counter() < end: x += 1
+    return x
+
+
+def run_mode(mode, seconds, box, gui_load, tick_rate):
+    slots, seen, last = LatestSlots(), collections.Counter(), {}
+    config = WorkerConfig(1, False, False, False, 15, box, "LAB", "left", COLORS[0], COLORS[1], True, True, tick_rate, False, "histogram", True)
+    handle = start_engine(mode, slots.publish, config, capture_backend="synthetic",
+                          capture_options={"patches": [(COLORS[0], (560, 300, 160, 160)), (COLORS[1], (200, 200, 120, 120))], "radius": 60},
+                          analyzer_options={"mode": "histogram"})
+    handle.update_window((False, 0, 0, 0, 0))
+    try:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            for message in slots.drain(): seen[message["type"]] += 1; last[message["type"]] = message
+            busy(POLL_INTERVAL * gui_load); time.sleep(POLL_INTERVAL * (1 - gui_load))
+    finally:
+        handle.stop()
+    stats = last.get("worker_stats", {})
+    tick = stats.get("perf", {}).get(TICK_STAGE, {})
+    print(f"{mode:<8} load {gui_load:.0%}: {stats.get('rate', 0):6.0f} ticks/s  tick p50 {tick.get('p50_ms', 0):.3f} ms  p99 {tick.get('p99_ms', 0):.3f} ms  "
+          f"max {tick.get('max_ms', 0):.3f} ms  previews {seen['preview']}  torn {getattr(handle, 'torn_frames', 0)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--box", type=int, default=300)
+    parser.add_argument("--tick-rate", type=int, default=1000)
+    parser.add_argument("--gui-load", type=float, nargs="+", default=[0.0, 0.8])
+    args = parser.parse_args()
+    for gui_load in args.gui_load:
+        for mode in ("thread", "process"): run_mode(mode, args.seconds, args.box, gui_load, args.tick_rate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Integer MaskKernel vs. the float32 masks it replaced: equivalence check plus cost per call.
+
+Run from the repository root:  python -m benchmarks.mask_kernel [--size 300] [--cases 200]
+
+The equivalence pass compares masks for random images (RGB, BGR and BGRA
+layouts), every metric, random targets and tolerances including the
+0/100/255 edges (ΔE94/ΔE2000 against the unpruned ``target_mask``), and
+exits with status 1 on any mismatch. The timing pass then reports latency and
+peak allocation per target test for both implementations.
+"""
+import argparse
+import sys
+
+import cv2
+import numpy as np
+
+from colorbot import Target
+from colorbot.colorspace import bgr_to_lab_array, rgb_to_lab_array
+from colorbot.lut import MaskKernel, target_mask
+from colorbot.matcher import METRICS
+
+from .common import measure_latency, measure_peak_alloc
+
+EDGE_TOLERANCES = (0, 1, 100, 255)
+
+
+def float_mask(np_image, image_lab, target, order="RGB"):
+    """The pre-kernel formulation: float32 LAB distance, int16 per-channel RGB difference; ``target_mask`` for ΔE94/ΔE2000."""
+    if target.metric not in ("LAB", "RGB"): return target_mask(np_image, image_lab, target, order)
+    if target.metric == "LAB":
+        return np.sum((image_lab.astype(np.float32) - np.array(target.lab, dtype=np.float32)) ** 2, axis=2) <= target.tolerance ** 2
+    target_rgb = target.rgb[::-1] if order == "BGR" else target.rgb
+    return np.all(np.abs(np_image[..., :3].astype(np.int16) - np.array(target_rgb, dtype=np.int16)) <= target.tolerance, axis=2)
+
+
+def check_equivalence(size, cases, seed=0):
+    rng = np.random.default_rng(seed)
+    kernel, failures = MaskKernel(), 0
+    for case in range(cases):
+        height, width = int(rng.integers(1, size + 1)), int(rng.integers(1, size + 1))
+        order, channels = [("RGB", 3), ("BGR", 3), ("BGR", 4)][case % 3]
+        image = rng.integers(0, 256, (height, width, channels), dtype=np.uint8)
+        # Plant the target color so small tolerances still produce matches.
+        rgb = tuple(int(c) for c in rng.integers(0, 256, 3))
+        image[: height // 4, :, :3] = rgb[::-1] if order == "BGR" else rgb
+        image_lab = bgr_to_lab_array(image) if order == "BGR" else rgb_to_lab_array(image)
+        tolerance = EDGE_TOLERANCES[case % len(EDGE_TOLERANCES)] if case % 5 == 0 else int(rng.integers(0, 101))
+        for metric in METRICS:
+            target = Target(rgb, tolerance, metric)
+            expected = float_mask(image, image_lab, target, order)
+            actual = kernel.mask(image, image_lab, target, order) != 0
+            if not np.array_equal(expected, actual):
+                failures += 1
+                print(f"MISMATCH case {case}: {metric} tol={tolerance} order={order} channels={channels} shape={image.shape[:2]} "
+                      f"differing pixels={int((expected != actual).sum())}")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--cases", type=int, default=200)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    failures = check_equivalence(args.size, args.cases)
+    print(f"equivalence: {args.cases * len(METRICS) - failures}/{args.cases * len(METRICS)} masks identical")
+
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (args.size, args.size, 4), dtype=np.uint8)
+    image_lab = cv2.cvtColor(image, cv2.COLOR_BGR2LAB)
+    kernel = MaskKernel()
+    for metric in METRICS:
+        target = Target((204, 204, 204), 15, metric)
+        for name, fn in (("float", lambda i: float_mask(image, image_lab, target, "BGR")), ("kernel", lambda i: kernel.mask(image, image_lab, target, "BGR"))):
+            stats = measure_latency(fn, args.iterations)
+            mean_alloc, _ = measure_peak_alloc(fn, 20)
+            print(f"{metric} {name:<7} {args.size}x{args.size}: p50 {stats['p50_ms']:.3f} ms  p99 {stats['p99_ms']:.3f} ms  alloc {mean_alloc / 1024:8.1f} KiB/call")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
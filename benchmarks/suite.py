@@ -0,0 +1,155 @@
+"""Benchmark suite for the detection hot path.
+
+Run from the repository root:
+
+    python -m benchmarks [--quick] [--output results.json] [--recording recordings/session_...]
+
+Measures, for capture boxes from 10 to 600 px (the Detection Box Size range),
+tolerances and target counts:
+
+* ``match``          ColorMatcher on a BGRA frame, with the lookup table and direct, and
+                     TiledMatcher's coarse-to-fine statistics
+* ``table_build``    building the 2**24-entry lookup table
+* ``dominant``       dominant-color analysis per backend
+* ``tick``           a full DetectionEngine tick on synthetic (and optionally recorded) frames
+
+Each case reports p50/p99/mean latency, throughput and peak allocation per
+call. Results are printed and, with ``--output``, written as JSON together
+with enough environment metadata to compare runs across commits and machines.
+"""
+import argparse
+import json
+import platform
+import subprocess
+import time
+
+import cv2
+import numpy as np
+
+from colorbot import ColorMatcher, DetectionEngine, DominantColorAnalyzer, ReplayCapture, SyntheticCapture, Target
+from colorbot.dominant import MODES as DOMINANT_MODES
+from colorbot.lut import build_match_table
+from colorbot.tiles import TiledMatcher
+
+from .common import measure_latency, measure_peak_alloc, wait_for_table
+
+DEFAULT_SIZES = [10, 50, 100, 200, 300, 450, 600]
+DEFAULT_TOLERANCES = [5, 15, 40]
+DEFAULT_TARGET_COUNTS = [1, 2, 4, 8]
+PALETTE = [(204, 204, 204), (38, 120, 122), (200, 50, 50), (50, 200, 50), (50, 50, 200), (30, 30, 30), (240, 200, 40), (120, 40, 160)]
+
+
+def synthetic_frame(size, seed=0):
+    """Noise with a band of each palette color, BGRA."""
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+    for rows, rgb in zip(np.array_split(np.arange(size // 2), len(PALETTE)), PALETTE): frame[rows, :, :3] = rgb[::-1]
+    return frame
+
+
+def targets_for(count, tolerance):
+    return [Target(PALETTE[i % len(PALETTE)], tolerance, "LAB") for i in range(count)]
+
+
+def environment():
+    try: commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5).stdout.strip() or None
+    except Exception: commit = None
+    return {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": commit, "python": platform.python_version(), "platform": platform.platform(),
+            "machine": platform.machine(), "processor": platform.processor(), "numpy": np.__version__, "opencv": cv2.__version__}
+
+
+class Suite:
+    def __init__(self, iterations, alloc_iterations):
+        self.iterations, self.alloc_iterations = iterations, alloc_iterations
+        self.results = []
+
+    def run_case(self, benchmark, params, fn, iterations=None):
+        stats = measure_latency(fn, iterations or self.iterations)
+        mean_alloc, max_alloc = measure_peak_alloc(fn, self.alloc_iterations)
+        row = {"benchmark": benchmark, "params": params, **stats, "alloc_mean_bytes": mean_alloc, "alloc_peak_bytes": max_alloc}
+        self.results.append(row)
+        param_str = " ".join(f"{k}={v}" for k, v in params.items())
+        print(f"{benchmark:<12} {param_str:<48} p50 {stats['p50_ms']:8.3f} ms  p99 {stats['p99_ms']:8.3f} ms  "
+              f"{stats['throughput_per_s']:10.1f}/s  alloc {mean_alloc / 1024:9.1f} KiB")
+
+    def match(self, sizes, tolerances, target_counts):
+        for count in target_counts:
+            for tolerance in tolerances:
+                targets = targets_for(count, tolerance)
+                table_matcher, direct_matcher = ColorMatcher(targets), ColorMatcher(targets, use_table=False)
+                wait_for_table(table_matcher)
+                tiler = TiledMatcher(table_matcher)
+                for size in sizes:
+                    frame = synthetic_frame(size)
+                    self.run_case("match", {"path": "table", "size": size, "tolerance": tolerance, "targets": count}, lambda i: table_matcher.match_bgra(frame))
+                    self.run_case("match", {"path": "direct", "size": size, "tolerance": tolerance, "targets": count}, lambda i: direct_matcher.match_bgra(frame))
+                    self.run_case("match", {"path": "tiled", "size": size, "tolerance": tolerance, "targets": count}, lambda i: tiler.match_bgra(frame))
+
+    def table_build(self, target_counts):
+        for count in target_counts:
+            targets = targets_for(count, 15)
+            self.run_case("table_build", {"targets": count}, lambda i: build_match_table(targets), iterations=3)
+
+    def dominant(self, sizes):
+        for mode in DOMINANT_MODES:
+            for size in sizes:
+                frames = [synthetic_frame(size, seed) for seed in range(8)]
+                analyzer = DominantColorAnalyzer(mode=mode)
+                self.run_case("dominant", {"mode": mode, "size": size}, lambda i: analyzer.analyze(frames[i % len(frames)]))
+
+    def tick(self, sizes, target_counts):
+        for count in target_counts:
+            colors = [PALETTE[i % len(PALETTE)] for i in range(count)]
+            for size in sizes:
+                capture = SyntheticCapture(patches=[(c, (560 + 20 * i, 300, 160, 160)) for i, c in enumerate(colors)], radius=60, change_every=10)
+                engine = DetectionEngine(capture); engine.configure(colors, 15)
+                wait_for_table(engine.matcher)
+
+                def one_tick(i):
+                    capture.advance()
+                    return engine.tick(*capture.cursor(), size)
+                self.run_case("tick", {"source": "synthetic", "size": size, "targets": count}, one_tick)
+
+    def tick_recorded(self, path):
+        capture = ReplayCapture(path, loop=True)
+        engine = DetectionEngine(capture)
+        engine.configure([tuple(c) for c in capture.index.get("colors", PALETTE[:2])], capture.index.get("tolerance", 15), capture.index.get("click_method", "LAB"))
+        wait_for_table(engine.matcher)
+
+        def one_tick(i):
+            capture.advance()
+            return engine.tick(*capture.cursor(), int(capture.record["box_sizes"]))
+        self.run_case("tick", {"source": f"recording:{path}"}, one_tick)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the detection hot path.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="capture box sizes in px (10-600)")
+    parser.add_argument("--tolerances", type=int, nargs="+", default=DEFAULT_TOLERANCES)
+    parser.add_argument("--targets", type=int, nargs="+", default=DEFAULT_TARGET_COUNTS, help="target color counts (max 8)")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--alloc-iterations", type=int, default=20)
+    parser.add_argument("--only", nargs="+", choices=["match", "table_build", "dominant", "tick"], help="run only these benchmarks")
+    parser.add_argument("--recording", action="append", default=[], help="session recording to replay in the tick benchmark (repeatable)")
+    parser.add_argument("--quick", action="store_true", help="small smoke run: 3 sizes, 1 tolerance, 2 target counts, 30 iterations")
+    parser.add_argument("--output", help="write results as JSON to this path")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sizes, args.tolerances, args.targets, args.iterations, args.alloc_iterations = [10, 300, 600], [15], [1, 2], 30, 5
+
+    suite = Suite(args.iterations, args.alloc_iterations)
+    selected = set(args.only or ["match", "table_build", "dominant", "tick"])
+    if "match" in selected: suite.match(args.sizes, args.tolerances, args.targets)
+    if "table_build" in selected: suite.table_build(args.targets)
+    if "dominant" in selected: suite.dominant(args.sizes)
+    if "tick" in selected:
+        suite.tick(args.sizes, args.targets)
+        for path in args.recording: suite.tick_recorded(path)
+
+    if args.output:
+        with open(args.output, 'w') as f: json.dump({"environment": environment(), "args": vars(args), "results": suite.results}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""TiledMatcher vs. a full match: estimate error and latency across capture box sizes.
+
+Run from the repository root:  python -m benchmarks.tiles [--sizes 200 300 450 600] [--frames 20]
+
+Frames are noise with filled shapes of the target colors, so tiles along the
+shape edges are mixed. For each size the script prints the worst percentage
+error over ``--frames`` frames, the share of tiles matched exactly and p50/p99
+latency of both paths. The tiled latency grows only with its 1-in-16 sample, so
+it falls behind the full match's as the box grows; where the two cross sets
+``engine.TILED_MIN_PIXELS``.
+"""
+import argparse
+
+import cv2
+import numpy as np
+
+from colorbot import ColorMatcher, Target, TiledMatcher
+
+from .common import measure_latency, wait_for_table
+
+COLORS = [(204, 204, 204), (38, 120, 122)]
+
+
+def shapes_frame(size, rng):
+    frame = rng.integers(0, 256, (size, size, 4), dtype=np.uint8)
+    for rgb in COLORS:
+        for _ in range(3):
+            center, radius = tuple(int(v) for v in rng.integers(0, size, 2)), int(rng.integers(size // 16, size // 4))
+            cv2.circle(frame, center, radius, rgb[::-1] + (255,), -1)
+    return frame
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[200, 300, 400, 450, 500, 600])
+    parser.add_argument("--frames", type=int, default=20)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    matcher = ColorMatcher([Target(c, 15) for c in COLORS]); wait_for_table(matcher)
+    tiler, rng = TiledMatcher(matcher), np.random.default_rng(0)
+    for size in args.sizes:
+        frames = [shapes_frame(size, rng) for _ in range(args.frames)]
+        worst, exact_share = 0.0, []
+        for frame in frames:
+            estimate = tiler.match_bgra(frame)
+            worst = max(worst, float(np.abs(estimate.percentages - matcher.match_bgra(frame).percentages).max()))
+            exact_share.append(estimate.exact.mean())
+        tiled = measure_latency(lambda i: tiler.match_bgra(frames[i % len(frames)]), args.iterations)
+        full = measure_latency(lambda i: matcher.match_bgra(frames[i % len(frames)]), args.iterations)
+        print(f"{size:4d}px: max error {worst:6.3f} pct-pt  exact tiles {np.mean(exact_share):6.1%}  "
+              f"tiled p50 {tiled['p50_ms']:.3f} ms p99 {tiled['p99_ms']:.3f} ms  full p50 {full['p50_ms']:.3f} ms p99 {full['p99_ms']:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Capture-independent color detection helpers used by the Color Checker app.
+
+Importing this package needs only numpy and OpenCV, so the engine can run
+headless (services, benchmarks) without the Tk GUI or input hooks. Anything
+else (mss, pyautogui/pydirectinput, PIL) is imported on first use, and the GUI
+helpers take duck-typed Tk widgets instead of importing Tk.
+"""
+from .capture import CaptureError, CaptureSource, MssCapture, ReplayCapture, SharedMemoryCapture, SyntheticCapture, create_capture
+from .colorspace import lab_to_rgb, rgb_to_lab
+from .dominant import DominantColorAnalyzer
+from .engine import ClickPolicy, DetectionEngine, TickResult
+from .framecache import MatchCache
+from .lut import MatchTable
+from .matcher import ColorMatcher, MatchResult, Target
+from .perf import PerfExporter, PerfMonitor
+from .pipeline import LatestSlot, LatestSlots, SlotStage, frame_fingerprint
+from .process import EngineProcess, FrameRing
+from .recorder import SessionRecorder, replay_session
+from .scheduler import TickScheduler
+from .tiles import TiledMatch, TiledMatcher
+from .window import WindowState, WindowTracker
+from .worker import DetectionWorker, EngineThread, WorkerConfig, start_engine
@@ -0,0 +1,252 @@
+"""Screen capture sources for the detection engine.
+
+A capture source returns frames as HxWx4 uint8 BGRA arrays (the mss layout)
+in screen coordinates. Backends import their screen-grabbing library in
+``open()``.
+
+Sources that replay a recording also drive the cursor: ``advance()`` steps
+to the next recorded tick and ``cursor()`` returns its position. Live sources
+always advance and leave the cursor to the caller.
+"""
+import glob
+import json
+import os
+
+import numpy as np
+
+RECORDING_INDEX = "index.json"
+RECORDING_CHUNK_PATTERN = "chunk_{:05d}.npz"
+
+
+class CaptureError(Exception):
+    """A grab failed transiently (e.g. region off-screen); the tick should just be skipped."""
+
+
+class CaptureSource:
+    """Base class for capture backends.
+
+    ``screen_size`` is the (width, height) of the primary screen used to clamp
+    the detection box and ``virtual_bounds`` the (left, top, width, height) of
+    the whole desktop. If ``reuses_buffer`` is true, a returned frame is only
+    valid until the next ``grab()``; callers that keep it must copy it.
+    """
+
+    reuses_buffer = False
+
+    def __init__(self):
+        self.screen_size = None
+        self.virtual_bounds = None
+
+    def open(self): return self
+
+    def close(self): pass
+
+    def __enter__(self): return self.open()
+
+    def __exit__(self, *exc_info): self.close()
+
+    def advance(self):
+        """Moves to the next tick. Returns False when the source is exhausted."""
+        return True
+
+    def cursor(self):
+        """Recorded (x, y) cursor position for the current tick, or None for live sources."""
+        return None
+
+    def grab(self, left, top, width, height):
+        raise NotImplementedError
+
+
+class MssCapture(CaptureSource):
+    """Captures through ``mss``. Open it on the thread that grabs: mss handles are not shared across threads."""
+
+    def __init__(self, screen_size=None):
+        super().__init__()
+        self.sct = None
+        self.screen_size = screen_size
+
+    def open(self):
+        import mss
+        self._screenshot_error = mss.ScreenShotError
+        self.sct = mss.mss()
+        monitors = self.sct.monitors
+        desktop = monitors[0]
+        self.virtual_bounds = (desktop["left"], desktop["top"], desktop["width"], desktop["height"])
+        if self.screen_size is None:
+            primary_monitor = monitors[1] if len(monitors) > 1 else monitors[0]
+            self.screen_size = (primary_monitor["width"], primary_monitor["height"])
+        return self
+
+    def close(self):
+        if self.sct: self.sct.close(); self.sct = None
+
+    def _grab_shot(self, left, top, width, height):
+        try: return self.sct.grab({"left": left, "top": top, "width": width, "height": height})
+        except self._screenshot_error as e: raise CaptureError(str(e)) from e
+
+    def grab(self, left, top, width, height):
+        """BGRA view over the grabbed bytes (no copy)."""
+        sct_img = self._grab_shot(left, top, width, height)
+        return np.frombuffer(sct_img.raw, dtype=np.uint8).reshape(sct_img.height, sct_img.width, 4)
+
+
+class SharedMemoryCapture(MssCapture):
+    """mss capture into one persistent ``multiprocessing.shared_memory`` block.
+
+    Every grab lands in the same buffer (sized for ``max_size`` and grown if a
+    larger region is requested), so the engine's working frame has a fixed
+    address that another process can attach to by ``name`` without copying.
+    """
+
+    reuses_buffer = True
+
+    def __init__(self, max_size=(600, 600), name=None, screen_size=None):
+        super().__init__(screen_size)
+        self.max_size, self.name = max_size, name
+        self.shm = None
+        self._retired = []
+
+    def open(self):
+        super().open()
+        self._allocate(*self.max_size)
+        return self
+
+    def _allocate(self, width, height):
+        from multiprocessing import shared_memory
+        name = self.name
+        if self.shm is not None: self.shm.unlink(); self._retired.append(self.shm); name = None
+        self._release_retired()
+        self.max_size = (width, height)
+        self.shm = shared_memory.SharedMemory(name=name, create=True, size=width * height * 4)
+        self.name = self.shm.name
+
+    def _release_retired(self):
+        # Frames handed out from an old block may still be alive; retry closing it on a later call.
+        still_used = []
+        for shm in self._retired:
+            try: shm.close()
+            except BufferError: still_used.append(shm)
+        self._retired = still_used
+
+    def close(self):
+        super().close()
+        if self.shm is not None: self.shm.unlink(); self._retired.append(self.shm); self.shm = None
+        self._release_retired()
+
+    def grab(self, left, top, width, height):
+        sct_img = self._grab_shot(left, top, width, height)
+        h, w = sct_img.height, sct_img.width
+        if w * h > self.max_size[0] * self.max_size[1]: self._allocate(max(w, self.max_size[0]), max(h, self.max_size[1]))
+        frame = np.ndarray((h, w, 4), dtype=np.uint8, buffer=self.shm.buf)
+        frame.reshape(-1)[:] = np.frombuffer(sct_img.raw, dtype=np.uint8)
+        return frame
+
+
+class _CroppingSource(CaptureSource):
+    """Serves grabs by cropping the current ``(frame, origin)``; requests outside it raise CaptureError."""
+
+    def __init__(self):
+        super().__init__()
+        self._frame, self._origin = None, (0, 0)
+
+    def grab(self, left, top, width, height):
+        if self._frame is None: raise CaptureError("No frame available")
+        x, y = left - self._origin[0], top - self._origin[1]
+        if x < 0 or y < 0 or x + width > self._frame.shape[1] or y + height > self._frame.shape[0]:
+            raise CaptureError(f"Region {(left, top, width, height)} outside the available frame")
+        return self._frame[y:y + height, x:x + width]
+
+
+class SyntheticCapture(_CroppingSource):
+    """Generated desktop for offline benchmarks: noise with flat color patches and a moving cursor.
+
+    ``patches`` is a list of (rgb, (x, y, w, h)). The cursor walks a circle of
+    ``radius`` px around the screen center, ``step`` px per tick; ``frames`` limits
+    the number of ticks (None = endless) and ``change_every`` re-rolls the noise
+    every N ticks to simulate screen updates (0 = static screen).
+    """
+
+    def __init__(self, screen_size=(1280, 720), patches=(), frames=None, radius=100, step=3.0, change_every=0, seed=0):
+        super().__init__()
+        self.screen_size, self.virtual_bounds = tuple(screen_size), (0, 0) + tuple(screen_size)
+        self.patches, self.frames, self.radius, self.step, self.change_every = patches, frames, radius, step, change_every
+        self._rng = np.random.default_rng(seed)
+        self._tick = -1
+        self._render()
+
+    def _render(self):
+        width, height = self.screen_size
+        screen = self._rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+        for rgb, (x, y, w, h) in self.patches: screen[y:y + h, x:x + w, :3] = tuple(rgb)[::-1]
+        self._frame = screen
+
+    def advance(self):
+        self._tick += 1
+        if self.frames is not None and self._tick >= self.frames: return False
+        if self.change_every and self._tick and self._tick % self.change_every == 0: self._render()
+        return True
+
+    def cursor(self):
+        width, height = self.screen_size
+        angle = self._tick * self.step / max(self.radius, 1)
+        return int(width // 2 + self.radius * np.cos(angle)), int(height // 2 + self.radius * np.sin(angle))
+
+
+class ReplayCapture(_CroppingSource):
+    """Streams a recording directory chunk by chunk.
+
+    Layout: ``index.json`` (at least ``screen_size``) plus ``chunk_NNNNN.npz``
+    files, each holding N ticks as ``timestamps`` (N,), ``cursors`` (N, 2),
+    ``origins`` (N, 2), ``shapes`` (N, 2) and the BGRA boxes concatenated in
+    ``pixels`` at ``offsets`` (N,); a 0x0 shape means nothing was captured
+    and an offset of -1 repeats the previous tick's box.
+    Any other per-tick arrays in a chunk are exposed through ``record``.
+
+    Each ``advance()`` moves to the next recorded tick; grabs are served by
+    cropping that tick's box, so replaying with the recorded box size
+    reproduces the original captures exactly. ``loop`` restarts at the end.
+    """
+
+    def __init__(self, path, loop=False):
+        super().__init__()
+        self.path, self.loop = path, loop
+        with open(os.path.join(path, RECORDING_INDEX)) as f: self.index = json.load(f)
+        self.screen_size = tuple(self.index["screen_size"])
+        self.virtual_bounds = (0, 0) + self.screen_size
+        self._chunk_paths = sorted(glob.glob(os.path.join(path, "chunk_*.npz")))
+        self._chunk_no, self._chunk, self._row = -1, None, 0
+        self.record = None
+
+    def _load_chunk(self, chunk_no):
+        with np.load(self._chunk_paths[chunk_no]) as data: self._chunk = {k: data[k] for k in data.files}
+        self._chunk_no, self._row = chunk_no, 0
+
+    def advance(self):
+        if self._chunk is None or self._row >= len(self._chunk["timestamps"]):
+            next_chunk = self._chunk_no + 1
+            if next_chunk >= len(self._chunk_paths):
+                if not self.loop or not self._chunk_paths: return False
+                next_chunk = 0
+            self._load_chunk(next_chunk)
+            if len(self._chunk["timestamps"]) == 0: return False
+        chunk, row = self._chunk, self._row
+        h, w = chunk["shapes"][row]
+        start = chunk["offsets"][row]
+        if not h or not w: self._frame = None
+        elif start >= 0: self._frame = chunk["pixels"][start:start + h * w * 4].reshape(h, w, 4)
+        self._origin = tuple(int(c) for c in chunk["origins"][row])
+        self.record = {k: v[row] for k, v in chunk.items() if k not in ("pixels", "offsets", "shapes")}
+        self._row += 1
+        return True
+
+    def cursor(self):
+        return None if self.record is None else tuple(int(c) for c in self.record["cursors"])
+
+
+CAPTURE_BACKENDS = {"mss": MssCapture, "shm": SharedMemoryCapture, "replay": ReplayCapture, "synthetic": SyntheticCapture}
+
+
+def create_capture(backend="mss", **options):
+    """Instantiates a capture backend by name (see ``CAPTURE_BACKENDS``)."""
+    if backend not in CAPTURE_BACKENDS: raise ValueError(f"Unknown capture backend: {backend}")
+    return CAPTURE_BACKENDS[backend](**options)
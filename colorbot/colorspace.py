@@ -0,0 +1,147 @@
+"""RGB/BGR(A) <-> 8-bit LAB conversions, batched for frames and memoized for single colors.
+
+All LAB values use OpenCV's 8-bit encoding (L scaled to 0..255, a and b
+offset by 128). The array functions take any ``(..., 3)`` (or BGRA
+``(..., 4)``) uint8 array and return the same leading shape, optionally
+writing into a preallocated ``out``. The scalar functions are LRU-cached, so
+repeated lookups (target colors, the cursor pixel, dominant-color centers)
+cost a dict hit instead of a 1x1 OpenCV call.
+"""
+import functools
+
+import cv2
+import numpy as np
+
+SCALAR_CACHE_SIZE = 1 << 16
+# Upper bound of the lightness weight S_L of each perceptual metric: ΔE >= |ΔL*| / S_L, so pixels whose
+# lightness differs from the reference by more than tolerance * bound can be rejected without the full formula.
+DELTA_E_LIGHTNESS_BOUND = {"DE94": 1.0, "DE2000": 1.75}
+# CIEDE2000 hues this close to opposite (radians, about 0.0006°) count as exactly opposite. It exceeds the float32
+# error of the hue angles, so float32 and float64 take the same branch of the hue mean.
+OPPOSITE_HUE_SLACK = 1e-5
+
+
+def _convert(pixels, code, out=None, dtype=np.uint8):
+    pixels = np.asarray(pixels, dtype=dtype)
+    if pixels.ndim == 3: return cv2.cvtColor(pixels, code, dst=out)
+    # cvtColor wants an image; view any other shape as a single row.
+    flat_out = None if out is None else out.reshape(1, -1, 3)
+    converted = cv2.cvtColor(np.ascontiguousarray(pixels).reshape(1, -1, pixels.shape[-1]), code, dst=flat_out)
+    return converted.reshape(pixels.shape[:-1] + (3,))
+
+
+def rgb_to_lab_array(rgb, out=None):
+    return _convert(rgb, cv2.COLOR_RGB2LAB, out)
+
+
+def bgr_to_lab_array(bgr, out=None):
+    """BGR or BGRA (alpha ignored, no intermediate BGR copy) to LAB."""
+    return _convert(bgr, cv2.COLOR_BGR2LAB, out)
+
+
+def lab_to_rgb_array(lab, out=None):
+    return _convert(lab, cv2.COLOR_LAB2RGB, out)
+
+
+def _clamped_pixel(color):
+    return np.uint8([[[max(0, min(255, int(c))) for c in color]]])
+
+
+@functools.lru_cache(maxsize=SCALAR_CACHE_SIZE)
+def _rgb_to_lab_cached(rgb):
+    return tuple(int(c) for c in cv2.cvtColor(_clamped_pixel(rgb), cv2.COLOR_RGB2LAB)[0, 0])
+
+
+@functools.lru_cache(maxsize=SCALAR_CACHE_SIZE)
+def _lab_to_rgb_cached(lab):
+    return tuple(int(c) for c in cv2.cvtColor(_clamped_pixel(lab), cv2.COLOR_LAB2RGB)[0, 0])
+
+
+def rgb_to_lab(rgb):
+    """LAB triple of one RGB color (components clamped to 0..255)."""
+    return _rgb_to_lab_cached(tuple(rgb))
+
+
+def lab_to_rgb(lab):
+    """RGB triple of one 8-bit LAB color (components clamped to 0..255)."""
+    return _lab_to_rgb_cached(tuple(lab))
+
+
+def to_cielab(np_image, order="RGB"):
+    """float32 CIE L*a*b* (L 0..100, a/b about ±127) of an RGB, BGR or BGRA uint8 array, for the perceptual ΔE metrics."""
+    scaled = np.asarray(np_image, dtype=np.float32) * np.float32(1 / 255)
+    return _convert(scaled, cv2.COLOR_BGR2LAB if order == "BGR" else cv2.COLOR_RGB2LAB, dtype=np.float32)
+
+
+@functools.lru_cache(maxsize=SCALAR_CACHE_SIZE)
+def _rgb_to_cielab_cached(rgb):
+    return tuple(float(c) for c in to_cielab(_clamped_pixel(rgb))[0, 0])
+
+
+def rgb_to_cielab(rgb):
+    """CIE L*a*b* float triple of one RGB color."""
+    return _rgb_to_cielab_cached(tuple(rgb))
+
+
+def delta_e94_sq(lab, reference, dtype=np.float64):
+    """Squared CIE94 (graphic arts weights) difference of CIE L*a*b* pixels ``lab`` (..., 3) from one ``reference`` color."""
+    lab = np.asarray(lab, dtype=dtype)
+    l1, a1, b1 = (dtype(c) for c in reference)
+    l2, a2, b2 = lab[..., 0], lab[..., 1], lab[..., 2]
+    c1, c2 = np.hypot(a1, b1), np.hypot(a2, b2)
+    dl, dc = l1 - l2, c1 - c2
+    dh_sq = np.maximum((a1 - a2) ** 2 + (b1 - b2) ** 2 - dc ** 2, 0)
+    return dl ** 2 + (dc / (1 + dtype(0.045) * c1)) ** 2 + dh_sq / (1 + dtype(0.015) * c1) ** 2
+
+
+# T(h) = 1 - 0.17 cos(h - 30°) + 0.24 cos(2h) + 0.32 cos(3h + 6°) - 0.20 cos(4h - 63°), as (cos kh, sin kh) weights
+# so that one sin/cos pair of the mean hue is enough.
+_T_WEIGHTS = tuple((w * np.cos(np.radians(phase)), -w * np.sin(np.radians(phase)))
+                   for w, phase in ((-0.17, -30), (0.24, 0), (0.32, 6), (-0.20, -63)))
+
+
+def delta_e2000_sq(lab, reference, dtype=np.float64):
+    """Squared CIEDE2000 difference (kL = kC = kH = 1) of CIE L*a*b* pixels ``lab`` (..., 3) from one ``reference`` color.
+
+    Hue angles stay in radians and T uses multiple-angle identities; float32
+    ``dtype`` is about twice as fast with ΔE errors around 1e-5.
+    """
+    lab = np.asarray(lab, dtype=dtype)
+    l1, a1, b1 = (dtype(c) for c in reference)
+    l2, a2, b2 = lab[..., 0], lab[..., 1], lab[..., 2]
+    pow25_7 = dtype(25.0 ** 7)
+    c_mean7 = ((np.hypot(a1, b1) + np.hypot(a2, b2)) / 2) ** 7
+    g1 = dtype(1.5) - dtype(0.5) * np.sqrt(c_mean7 / (c_mean7 + pow25_7))
+    a1p, a2p = a1 * g1, a2 * g1
+    c1p, c2p = np.hypot(a1p, b1), np.hypot(a2p, b2)
+    two_pi = dtype(2 * np.pi)
+    h1p, h2p = np.arctan2(b1, a1p) % two_pi, np.arctan2(b2, a2p) % two_pi
+
+    # Hue difference and mean hue as in Sharma et al. (2005), with hues in [0, 2π). An exactly opposite pair
+    # (|h1' - h2'| = π, see ``OPPOSITE_HUE_SLACK``) counts as the short arc, so it keeps Δh' = h2' - h1' and the
+    # plain mean; zero chroma makes the mean the sum of the hues.
+    chroma_product = c1p * c2p
+    h_diff, h_sum = h2p - h1p, h1p + h2p
+    short = np.abs(h_diff) <= np.pi + OPPOSITE_HUE_SLACK
+    dhp = np.where(short, h_diff, h_diff - np.copysign(two_pi, h_diff))
+    dHp = 2 * np.sqrt(chroma_product) * np.sin(dhp / 2)
+    hp_mean = np.where(short, h_sum / 2, np.where(h_sum < two_pi, h_sum / 2 + dtype(np.pi), h_sum / 2 - dtype(np.pi)))
+    hp_mean = np.where(chroma_product == 0, h_sum, hp_mean)
+    cos1, sin1 = np.cos(hp_mean), np.sin(hp_mean)
+    cos2, sin2 = 2 * cos1 * cos1 - 1, 2 * sin1 * cos1
+    cos3, sin3 = cos1 * (4 * cos1 * cos1 - 3), sin1 * (3 - 4 * sin1 * sin1)
+    cos4, sin4 = 2 * cos2 * cos2 - 1, 2 * sin2 * cos2
+    t = 1 + sum(dtype(wc) * c + dtype(ws) * s for (wc, ws), c, s in zip(_T_WEIGHTS, (cos1, cos2, cos3, cos4), (sin1, sin2, sin3, sin4)))
+    d_theta = dtype(np.radians(30)) * np.exp(-(((np.degrees(hp_mean) % 360 - 275) / 25) ** 2))
+
+    cp_mean = (c1p + c2p) / 2
+    cp_mean7 = cp_mean ** 7
+    rc = 2 * np.sqrt(cp_mean7 / (cp_mean7 + pow25_7))
+    l_offset_sq = ((l1 + l2) / 2 - 50) ** 2
+    sl = 1 + dtype(0.015) * l_offset_sq / np.sqrt(20 + l_offset_sq)
+    sc, sh = 1 + dtype(0.045) * cp_mean, 1 + dtype(0.015) * cp_mean * t
+    dl, dc, dh = (l2 - l1) / sl, (c2p - c1p) / sc, dHp / sh
+    return dl * dl + dc * dc + dh * dh - np.sin(2 * d_theta) * rc * dc * dh
+
+
+DELTA_E_SQ = {"DE94": delta_e94_sq, "DE2000": delta_e2000_sq}
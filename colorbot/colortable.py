@@ -0,0 +1,69 @@
+"""Incremental rows for the Detected Colors table.
+
+Dominant colors arrive several times a second and mostly repeat the last
+list with small jitter. ``ColorRows`` creates a fixed pool of Treeview items,
+each with its own tag, once, and gives each color ``id`` (the stable cluster
+or bin id from ``dominant``) one item for as long as the id stays in the list.
+``update`` rewrites only the rows whose color or share moved beyond a small
+threshold, reconfigures a row's tag only when its color changed, reorders
+rows with ``move`` when two colors swap ranks, and detaches the items of
+vanished ids instead of deleting them. The tree only needs ``insert``,
+``item``, ``move``, ``detach`` and ``tag_configure``.
+"""
+RGB_THRESHOLD = 2  # largest per-channel change that leaves a row as shown
+PERCENT_THRESHOLD = 0.2
+SWATCH_TEXT = '███'
+
+
+def text_color(rgb):
+    """Black or white, whichever reads better on an ``rgb`` background."""
+    luminance = (0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]) / 255
+    return "black" if luminance > 0.5 else "white"
+
+
+class ColorRows:
+    """A pool of ``size`` rows in ``tree`` showing the latest dominant-color list."""
+
+    def __init__(self, tree, size, rgb_threshold=RGB_THRESHOLD, percent_threshold=PERCENT_THRESHOLD):
+        self.tree, self.size, self.rgb_threshold, self.percent_threshold = tree, size, rgb_threshold, percent_threshold
+        iids = [f"color_{i}" for i in range(size)]
+        for iid in iids: tree.insert('', 'end', iid=iid, values=(SWATCH_TEXT, '', '', ''), tags=(iid,))
+        if iids: tree.detach(*iids)
+        self.free = iids[::-1]  # detached items, reused last-freed first
+        self.rows = {}  # color id -> item
+        self.order = []  # attached items, top to bottom
+        self.shown = {}  # item -> (rgb, percentage) displayed; absent while detached
+        self.tag_rgb = {}  # item -> background its tag was last configured with
+        self.written = self.skipped = self.moved = 0
+
+    def _unchanged(self, shown, rgb, percent):
+        return max(abs(a - b) for a, b in zip(rgb, shown[0])) <= self.rgb_threshold and abs(percent - shown[1]) <= self.percent_threshold
+
+    def update(self, colors):
+        """Shows ``colors`` (dicts with 'id', 'rgb', 'lab', 'percentage'), at most ``size`` of them.
+
+        Rows follow ``id``; colors without one are keyed by rank.
+        """
+        colors = list(colors)[:self.size]
+        keys = [color.get('id', rank) for rank, color in enumerate(colors)]
+        kept = set(keys)
+        gone = [key for key in self.rows if key not in kept]
+        if gone:
+            items = [self.rows.pop(key) for key in gone]
+            self.tree.detach(*items)
+            for iid in items: self.order.remove(iid); self.shown.pop(iid); self.free.append(iid)
+        for position, (key, color) in enumerate(zip(keys, colors)):
+            iid = self.rows.get(key)
+            if iid is None: iid = self.rows[key] = self.free.pop()
+            if position >= len(self.order) or self.order[position] != iid:
+                self.tree.move(iid, '', position); self.moved += 1
+                if iid in self.order: self.order.remove(iid)
+                self.order.insert(position, iid)
+            rgb, lab, percent = tuple(color['rgb']), color['lab'], color['percentage']
+            shown = self.shown.get(iid)
+            if shown is not None and self._unchanged(shown, rgb, percent): self.skipped += 1; continue
+            if self.tag_rgb.get(iid) != rgb:
+                self.tree.tag_configure(iid, background=f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}', foreground=text_color(rgb))
+                self.tag_rgb[iid] = rgb
+            self.tree.item(iid, values=(SWATCH_TEXT, f"{rgb[0]}, {rgb[1]}, {rgb[2]}", f"{lab[0]}, {lab[1]}, {lab[2]}", f"{percent:.1f}%"))
+            self.shown[iid] = (rgb, percent); self.written += 1
@@ -0,0 +1,128 @@
+"""Dominant color extraction for the capture area."""
+import cv2
+import numpy as np
+
+from .colorspace import bgr_to_lab_array, lab_to_rgb_array
+
+DEFAULT_K = 10
+DEFAULT_RESIZE_WIDTH = 64
+DEFAULT_MIN_PERCENT = 2.0
+COLD_ATTEMPTS = 10
+WARM_ITERATIONS = 3
+RESEED_COMPACTNESS_RATIO = 2.0
+HISTOGRAM_BINS = 16
+HISTOGRAM_MERGE_RADIUS = 1
+MODES = ("streaming", "full", "histogram")
+
+
+def _downscaled_lab(np_image_bgra, resize_width):
+    w = np_image_bgra.shape[1]
+    scale = min(1.0, resize_width / w) if w > 0 and resize_width else 1.0
+    resized_img = cv2.resize(np_image_bgra, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR) if scale < 1.0 else np_image_bgra
+    return bgr_to_lab_array(resized_img)
+
+
+def histogram_peaks(lab_pixels, max_peaks, bins=HISTOGRAM_BINS, merge_radius=HISTOGRAM_MERGE_RADIUS):
+    """Dominant colors as peaks of a ``bins``**3 LAB histogram.
+
+    Peaks are taken greedily by count; each one absorbs the not yet claimed
+    bins within ``merge_radius`` bins of it (non-maximum merging). Returns
+    ``(bin_ids, centers_lab, counts)`` with centers the pixel-weighted mean of
+    the merged bins. Cost is one bincount pass plus O(max_peaks) work on the
+    fixed-size grid, independent of image content.
+    """
+    shift = 8 - int(np.log2(bins))
+    q = (lab_pixels >> shift).astype(np.intp)
+    flat = (q[:, 0] * bins + q[:, 1]) * bins + q[:, 2]
+    size = bins ** 3
+    counts = np.bincount(flat, minlength=size)
+    sums = np.stack([np.bincount(flat, weights=lab_pixels[:, c], minlength=size) for c in range(3)], axis=1)
+
+    grid = counts.reshape(bins, bins, bins)
+    remaining = grid.copy()
+    owner = np.full(grid.shape, -1, dtype=np.intp)
+    peak_bins = []
+    for peak in range(max_peaks):
+        idx = int(remaining.argmax())
+        if remaining.flat[idx] == 0: break
+        l, a, b = np.unravel_index(idx, grid.shape)
+        region = tuple(slice(max(0, c - merge_radius), c + merge_radius + 1) for c in (l, a, b))
+        unclaimed = owner[region] == -1
+        owner[region][unclaimed] = peak
+        remaining[region] = 0
+        peak_bins.append(idx)
+
+    claimed = owner.ravel() >= 0
+    peak_counts = np.bincount(owner.ravel()[claimed], weights=counts[claimed], minlength=len(peak_bins))
+    peak_sums = np.stack([np.bincount(owner.ravel()[claimed], weights=sums[claimed, c], minlength=len(peak_bins)) for c in range(3)], axis=1)
+    centers = peak_sums / np.maximum(peak_counts, 1)[:, None]
+    return np.array(peak_bins, dtype=np.intp), centers, peak_counts
+
+
+def _nearest_center(pixels, centers):
+    dist = ((pixels[:, None, :] - centers[None, :, :]) ** 2).sum(axis=2)
+    return dist.argmin(axis=1).astype(np.int32)
+
+
+class DominantColorAnalyzer:
+    """Dominant colors of the capture in LAB.
+
+    In ``"streaming"`` mode each frame is seeded with the previous frame's
+    centers and refined with a single short k-means attempt, so cluster ``i``
+    keeps describing the same color from frame to frame (reported as ``id``).
+    A full k-means++ run with several attempts is only done for the first
+    frame, after ``reset()``, or when the warm result fits much worse than the
+    last full run. ``"full"`` mode always does the full run.
+
+    ``"histogram"`` mode replaces k-means with ``histogram_peaks``; it is cheap
+    enough to run on the full-resolution capture (``histogram_resize_width``
+    None) and its ``id`` is the peak's histogram bin.
+    """
+
+    def __init__(self, k=DEFAULT_K, resize_width=DEFAULT_RESIZE_WIDTH, min_percent=DEFAULT_MIN_PERCENT, mode="streaming", histogram_resize_width=None):
+        self.k, self.resize_width, self.min_percent = k, resize_width, min_percent
+        self.histogram_resize_width = histogram_resize_width
+        self.set_mode(mode)
+
+    def set_mode(self, mode):
+        if mode not in MODES: raise ValueError(f"Unknown dominant color mode: {mode}")
+        self.mode = mode
+        self.reset()
+
+    def reset(self):
+        self._centers, self._cold_compactness = None, None
+
+    def analyze(self, np_image_bgra):
+        """List of ``{'id', 'rgb', 'lab', 'percentage'}`` dicts, most frequent first."""
+        if np_image_bgra is None or np_image_bgra.size == 0: return []
+        if self.mode == "histogram": return self._analyze_histogram(np_image_bgra)
+        pixels = _downscaled_lab(np_image_bgra, self.resize_width).reshape(-1, 3).astype(np.float32)
+        if len(pixels) < self.k: return []
+
+        centers = labels = None
+        prev_centers, cold_compactness = self._centers, self._cold_compactness
+        if self.mode == "streaming" and prev_centers is not None:
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, WARM_ITERATIONS, 1.0)
+            compactness, labels, centers = cv2.kmeans(pixels, self.k, _nearest_center(pixels, prev_centers).reshape(-1, 1), criteria, 1, cv2.KMEANS_USE_INITIAL_LABELS)
+            if compactness > RESEED_COMPACTNESS_RATIO * cold_compactness: centers = None
+        if centers is None:
+            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
+            compactness, labels, centers = cv2.kmeans(pixels, self.k, None, criteria, COLD_ATTEMPTS, cv2.KMEANS_PP_CENTERS)
+            self._cold_compactness = max(compactness, 1.0)
+        self._centers = centers
+
+        percentages = np.bincount(labels.ravel(), minlength=self.k) * (100.0 / len(pixels))
+        return self._report(range(self.k), centers, percentages)
+
+    def _analyze_histogram(self, np_image_bgra):
+        lab_pixels = _downscaled_lab(np_image_bgra, self.histogram_resize_width).reshape(-1, 3)
+        bin_ids, centers, counts = histogram_peaks(lab_pixels, self.k)
+        if len(bin_ids) == 0: return []
+        return self._report(bin_ids.tolist(), centers, counts * (100.0 / len(lab_pixels)))
+
+    def _report(self, ids, centers, percentages):
+        centers_lab = np.clip(np.rint(centers), 0, 255).astype(np.uint8)
+        centers_rgb = lab_to_rgb_array(centers_lab)
+        dominant_colors = [{'id': color_id, 'rgb': tuple(map(int, centers_rgb[i])), 'lab': tuple(map(int, centers_lab[i])), 'percentage': float(percentages[i])}
+                           for i, color_id in enumerate(ids) if percentages[i] >= self.min_percent]
+        return sorted(dominant_colors, key=lambda x: x['percentage'], reverse=True)
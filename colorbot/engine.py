@@ -0,0 +1,168 @@
+"""GUI-free detection engine: capture, match, click decision and analysis for one tick.
+
+Only numpy and OpenCV are imported; the capture backend brings in its own
+dependency when opened. The caller supplies the cursor position, performs
+any click, and decides what to show.
+"""
+import collections
+import time
+import traceback
+
+import cv2
+
+from .capture import CaptureError
+from .dominant import DominantColorAnalyzer
+from .framecache import MatchCache
+from .matcher import ColorMatcher, Target
+from .perf import PerfMonitor
+from .pipeline import frame_fingerprint
+from .tiles import TiledMatcher
+
+DEFAULT_CLICK_COOLDOWN = 0.05
+OVERLAY_COLORS = [(255, 0, 0), (0, 0, 255)]
+# Boxes with more pixels than this get coarse-to-fine statistics (see ``TiledMatcher``) instead of a full match.
+# Tiling breaks even with a full match around 400 px and is clearly faster from 480 px (``benchmarks.tiles``).
+TILED_MIN_PIXELS = 480 * 480
+
+TickResult = collections.namedtuple('TickResult', 'status center_rgb click frame origin fingerprint match')
+TickResult.__doc__ = """Outcome of ``DetectionEngine.tick``.
+
+``status`` is None when no area was captured, else "ok", "invalid_target" or
+"error". ``center_rgb`` is None unless the center pixel was checked. ``match``
+is the area MatchResult, or a TiledMatch for boxes above ``TILED_MIN_PIXELS``
+(None unless status is "ok")."""
+
+
+class ClickPolicy:
+    """Clicks when the cursor pixel matches any click target, at most once per ``cooldown`` seconds."""
+
+    def __init__(self, cooldown=DEFAULT_CLICK_COOLDOWN):
+        self.cooldown = cooldown
+        self.last_click_time = 0
+
+    def decide(self, center_bits, click_bits, now=None):
+        if not center_bits & click_bits: return False
+        now = time.monotonic() if now is None else now
+        if now - self.last_click_time <= self.cooldown: return False
+        self.last_click_time = now
+        return True
+
+
+class DetectionEngine:
+    """Matches the box around the cursor against N colors and decides whether to click.
+
+    Area targets always use LAB (bits ``0..N-1`` of the label image). The click
+    check uses the same bits for the "LAB" click method, otherwise the colors
+    are added again with the click metric as bits ``N..2N-1``; those are
+    pixel-only targets, read for the center pixel alone (``match_pixel``), so
+    frames matched before the table is ready never run the click metric. Boxes above
+    ``tiled_min_pixels`` are matched by ``tiler``, whose cost grows with its
+    sample rather than with the box. Stage timings (area_grab, match,
+    center_grab, convert, overlay, dominant) go to ``perf``.
+    """
+
+    def __init__(self, capture, analyzer=None, policy=None, perf=None, tiled_min_pixels=TILED_MIN_PIXELS):
+        self.capture = capture
+        self.matcher = ColorMatcher()
+        self.cache = MatchCache(self.matcher, detach=self.detach)
+        self.tiler = TiledMatcher(self.matcher)
+        self.tiled_min_pixels = tiled_min_pixels
+        self.analyzer = analyzer if analyzer is not None else DominantColorAnalyzer()
+        self.policy = policy if policy is not None else ClickPolicy()
+        self.perf = perf if perf is not None else PerfMonitor()
+        self.colors, self.click_bits = (), 0
+
+    @property
+    def targets_valid(self):
+        return bool(self.colors) and all(self.colors)
+
+    def configure(self, colors, tolerance, click_method="LAB"):
+        self.colors = tuple(colors)
+        if not self.targets_valid: return
+        n = len(self.colors)
+        targets = [Target(c, tolerance, "LAB") for c in self.colors]
+        if click_method == "LAB": self.click_bits = (1 << n) - 1
+        else: targets += [Target(c, tolerance, click_method) for c in self.colors]; self.click_bits = ((1 << n) - 1) << n
+        self.matcher.set_targets(targets, pixel_only=range(n, len(targets)))
+
+    def capture_region(self, mouse_x, mouse_y, box_size):
+        """(left, top, width, height) of the box centered on the cursor, clamped to the primary screen."""
+        screen_width, screen_height = self.capture.screen_size
+        half_size = box_size // 2
+        left, top = max(0, mouse_x - half_size), max(0, mouse_y - half_size)
+        return left, top, min(box_size, screen_width - left), min(box_size, screen_height - top)
+
+    def tick(self, mouse_x, mouse_y, box_size, need_area=True, check_center=True, now=None):
+        """Runs one detection tick; ``now`` (monotonic seconds) lets replays apply the click cooldown in recorded time."""
+        status = center_rgb = frame = origin = fingerprint = match = None
+        center_bits, center_from_area = 0, False
+        perf, t = self.perf, time.perf_counter()
+
+        if need_area:
+            left, top, width, height = self.capture_region(mouse_x, mouse_y, box_size)
+            if width > 0 and height > 0:
+                try:
+                    frame = self.capture.grab(left, top, width, height)
+                    t = perf.mark("area_grab", t)
+                    if frame.size > 0:
+                        origin, fingerprint = (left, top), frame_fingerprint(frame)
+                        if not self.targets_valid: status = "invalid_target"
+                        elif width * height > self.tiled_min_pixels: match = self.tiler.match_bgra(frame); status = "ok"
+                        else: match = self.cache.match_bgra(frame, origin, fingerprint); status = "ok"
+                        t = perf.mark("match", t)
+
+                        # The box is centered on the cursor, so the click check reads the same capture.
+                        center_y, center_x = mouse_y - top, mouse_x - left
+                        if check_center and 0 <= center_y < frame.shape[0] and 0 <= center_x < frame.shape[1]:
+                            center_rgb = tuple(int(c) for c in frame[center_y, center_x, 2::-1])
+                            if match is not None and match.labels is not None and not self.matcher.pixel_only_bits: center_bits = int(match.labels[center_y, center_x])
+                            elif match is not None: center_bits = self.matcher.match_pixel(center_rgb)
+                            center_from_area = True
+                    else: frame = None
+                except CaptureError: frame = None
+                except Exception as e:
+                    print(f"Engine Error (Area Grab/Calc): {e}"); traceback.print_exc()
+                    status, frame, match = "error", None, None
+
+        if check_center and not center_from_area:
+            # 1x1 fast path: the area is not needed or the cursor is outside the clamped box.
+            try:
+                pixel = self.capture.grab(mouse_x, mouse_y, 1, 1)
+                if pixel.size > 0:
+                    center_rgb = tuple(int(c) for c in pixel[0, 0, 2::-1])
+                    if self.targets_valid: center_bits = self.matcher.match_pixel(center_rgb)
+            except CaptureError: pass
+            except Exception as e: print(f"Engine Error (Center Grab): {e}"); center_rgb = None
+            perf.mark("center_grab", t)
+
+        click = self.policy.decide(center_bits, self.click_bits, now)
+        return TickResult(status, center_rgb, click, frame, origin, fingerprint, match)
+
+    def detach(self, frame):
+        """A frame that stays valid after the next tick (copied only if the capture reuses its buffer)."""
+        return frame.copy() if frame is not None and self.capture.reuses_buffer else frame
+
+    def preview(self, result, overlay_colors=OVERLAY_COLORS):
+        """(capture RGB, overlay RGB) for a tick's frame; reused while the cache keeps hitting."""
+        if result.frame is None: return None, None
+        t = time.perf_counter()
+        if result.match is None: capture_rgb = cv2.cvtColor(result.frame, cv2.COLOR_BGRA2RGB); self.perf.mark("convert", t); return capture_rgb, None
+        if result.match.labels is None:
+            # Tiled matches carry no label image; the overlay matches the frame in full, at preview rate only.
+            capture_rgb = cv2.cvtColor(result.frame, cv2.COLOR_BGRA2RGB)
+            t = self.perf.mark("convert", t)
+            overlay = self.matcher.overlay(capture_rgb, self.matcher.labels_bgra(result.frame), overlay_colors)
+            self.perf.mark("overlay", t)
+            return capture_rgb, overlay
+        capture_rgb = self.cache.derive("capture_rgb", lambda: cv2.cvtColor(result.frame, cv2.COLOR_BGRA2RGB))
+        t = self.perf.mark("convert", t)
+        overlay = self.cache.derive("overlay", lambda: self.matcher.overlay(capture_rgb, result.match.labels, overlay_colors))
+        self.perf.mark("overlay", t)
+        return capture_rgb, overlay
+
+    def analyze(self, frame):
+        """Dominant colors of a BGRA frame (safe to call from a separate analysis thread)."""
+        t = time.perf_counter()
+        colors = self.analyzer.analyze(frame)
+        self.perf.mark("dominant", t)
+        return colors
@@ -0,0 +1,81 @@
+"""Reuse of match results across consecutive captures."""
+import numpy as np
+
+from .pipeline import frame_fingerprint
+
+
+class MatchCache:
+    """Wraps a ColorMatcher and skips work the previous capture already did.
+
+    * Same pixels at the same screen origin: the previous MatchResult (and any
+      artifacts registered through ``derive``) is returned as-is.
+    * Box moved but the overlapping pixels are unchanged: the overlap's labels
+      are shifted over and only the newly exposed rows/columns are matched.
+    * Anything else is a full match.
+
+    The cache keeps the frame of the stored result for these comparisons, as
+    returned by ``detach(frame)``; the default keeps a reference, which is
+    enough for captures that return a new buffer per grab. Pass a copying
+    ``detach`` (e.g. ``DetectionEngine.detach``) for captures that reuse theirs.
+    """
+
+    def __init__(self, matcher, detach=None):
+        self.matcher = matcher
+        self.detach = detach
+        self.hits = self.partial_hits = self.misses = 0
+        self._frame = None
+        self._state = None
+        self._result = None
+        self._derived = {}
+
+    @property
+    def lookups(self): return self.hits + self.partial_hits + self.misses
+
+    @property
+    def hit_ratio(self):
+        """Fraction of lookups that reused at least part of the previous result."""
+        return (self.hits + self.partial_hits) / self.lookups if self.lookups else 0.0
+
+    def reset_stats(self):
+        self.hits = self.partial_hits = self.misses = 0
+
+    def match_bgra(self, np_image_bgra, origin=(0, 0), fingerprint=None):
+        """Like ``ColorMatcher.match_bgra``; ``origin`` is the capture's (left, top) on screen."""
+        if fingerprint is None: fingerprint = frame_fingerprint(np_image_bgra)
+        state = (self.matcher.targets, self.matcher.table.is_ready(), np_image_bgra.shape)
+        prev_state, prev_result = self._state, self._result
+        if prev_state is not None and prev_state[0] == state:
+            prev_origin, prev_fingerprint = prev_state[1], prev_state[2]
+            if prev_origin == tuple(origin) and prev_fingerprint == fingerprint and np.array_equal(self._frame, np_image_bgra):
+                self.hits += 1
+                return prev_result
+            labels = self._shifted_labels(np_image_bgra, prev_origin, origin, prev_result.labels)
+            if labels is not None:
+                self.partial_hits += 1
+                return self._store(np_image_bgra, state, origin, fingerprint, self.matcher.from_labels(labels))
+        self.misses += 1
+        return self._store(np_image_bgra, state, origin, fingerprint, self.matcher.match_bgra(np_image_bgra))
+
+    def derive(self, name, fn):
+        """Returns ``fn()``, computed once per distinct match result (e.g. the RGB preview or overlay)."""
+        if name not in self._derived: self._derived[name] = fn()
+        return self._derived[name]
+
+    def _store(self, np_image_bgra, state, origin, fingerprint, result):
+        self._frame = np_image_bgra if self.detach is None else self.detach(np_image_bgra)
+        self._state, self._result, self._derived = (state, tuple(origin), fingerprint), result, {}
+        return result
+
+    def _shifted_labels(self, np_image_bgra, prev_origin, origin, prev_labels):
+        h, w = np_image_bgra.shape[:2]
+        dx, dy = origin[0] - prev_origin[0], origin[1] - prev_origin[1]
+        y0, y1, x0, x1 = max(0, -dy), min(h, h - dy), max(0, -dx), min(w, w - dx)
+        if y1 <= y0 or x1 <= x0: return None
+        if not np.array_equal(np_image_bgra[y0:y1, x0:x1], self._frame[y0 + dy:y1 + dy, x0 + dx:x1 + dx]): return None
+        labels = np.empty((h, w), dtype=np.uint8)
+        labels[y0:y1, x0:x1] = prev_labels[y0 + dy:y1 + dy, x0 + dx:x1 + dx]
+        if y0 > 0: labels[:y0] = self.matcher.labels_bgra(np_image_bgra[:y0])
+        if y1 < h: labels[y1:] = self.matcher.labels_bgra(np_image_bgra[y1:])
+        if x0 > 0: labels[y0:y1, :x0] = self.matcher.labels_bgra(np_image_bgra[y0:y1, :x0])
+        if x1 < w: labels[y0:y1, x1:] = self.matcher.labels_bgra(np_image_bgra[y0:y1, x1:])
+        return labels
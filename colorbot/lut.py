@@ -0,0 +1,208 @@
+"""Precomputed 24-bit RGB -> match bitmask lookup tables.
+
+A table holds one entry per possible RGB value (2**24 entries). Bit ``i`` of an
+entry is set when that color matches target ``i``, so matching a frame is a
+single gather instead of a color conversion plus arithmetic per target.
+"""
+import sys
+import threading
+import traceback
+
+import cv2
+import numpy as np
+
+from .colorspace import DELTA_E_LIGHTNESS_BOUND, DELTA_E_SQ, rgb_to_cielab, rgb_to_lab_array, to_cielab
+
+TABLE_SIZE = 1 << 24
+MAX_TARGETS = 8
+MAX_KERNEL_SHAPES = 4
+OPENCV_SCALAR_SIZE = 4  # OpenCV takes an array of this many elements or fewer (e.g. a 1x1 image) for the scalar operand
+SQUARES = np.arange(256, dtype=np.int32) ** 2
+# Relative band around tolerance² inside which a float32 ΔE is recomputed in float64.
+DELTA_E_RECHECK = 1e-3
+
+
+def pack_rgb(np_image_rgb):
+    """Packs an HxWx3 uint8 RGB image into HxW uint32 ``R<<16 | G<<8 | B`` keys."""
+    keys = np_image_rgb[..., 0].astype(np.uint32)
+    keys <<= 8; keys |= np_image_rgb[..., 1]
+    keys <<= 8; keys |= np_image_rgb[..., 2]
+    return keys
+
+
+def pack_bgra(np_image_bgra):
+    """Packs an HxWx4 uint8 BGRA image (the mss layout) into HxW uint32 ``R<<16 | G<<8 | B`` keys.
+
+    On little-endian hosts each BGRA pixel already reads as ``A<<24 | R<<16 | G<<8 | B``
+    when viewed as uint32, so only the alpha byte has to be masked off. Strided
+    views (e.g. every 4th pixel of a frame) work as long as each pixel's 4 bytes are contiguous.
+    """
+    if sys.byteorder == "little" and np_image_bgra.strides[-1] == 1 and np_image_bgra.strides[-2] % 4 == 0:
+        return np.bitwise_and(np_image_bgra.view(np.uint32)[..., 0], 0xFFFFFF)
+    return pack_rgb(np_image_bgra[..., 2::-1])
+
+
+def _rgb_slice(r):
+    """Returns the 256x256 RGB plane for a fixed red value (rows = G, cols = B)."""
+    plane = np.empty((256, 256, 3), dtype=np.uint8)
+    plane[..., 0] = r
+    plane[..., 1] = np.arange(256, dtype=np.uint8)[:, None]
+    plane[..., 2] = np.arange(256, dtype=np.uint8)[None, :]
+    return plane
+
+
+def target_mask(np_image_rgb, image_lab, target, order="RGB"):
+    """Boolean HxW mask of pixels matching ``target``; ``image_lab`` is only read for LAB targets.
+
+    Reference implementation; the matcher and the table build use ``MaskKernel``.
+
+    With ``order="BGR"`` the image channels are BGR (or BGRA) and RGB targets are swizzled to match.
+    """
+    if target.metric == "LAB":
+        diff = image_lab.astype(np.int32) - np.array(target.lab, dtype=np.int32)
+        return np.einsum('ijk,ijk->ij', diff, diff) <= int(target.tolerance) ** 2
+    if target.metric == "RGB":
+        target_rgb = target.rgb[::-1] if order == "BGR" else target.rgb
+        diff = np.abs(np_image_rgb[..., :3].astype(np.int16) - np.array(target_rgb, dtype=np.int16))
+        return np.all(diff <= int(target.tolerance), axis=2)
+    if target.metric in DELTA_E_SQ:
+        return DELTA_E_SQ[target.metric](to_cielab(np_image_rgb[..., :3], order), rgb_to_cielab(target.rgb)) <= float(target.tolerance) ** 2
+    raise ValueError(f"Unknown match metric: {target.metric}")
+
+
+class MaskKernel:
+    """Integer per-target tests on uint8 images, same results as ``target_mask``.
+
+    LAB: ``cv2.absdiff`` against the target, per-channel squares through a
+    256-entry int32 ``cv2.LUT``, summed in place and compared with tolerance².
+    RGB: one ``cv2.inRange`` over ``target ± tolerance``. DE94/DE2000: the
+    float32 formula only for pixels inside the metric's lightness bound (see
+    ``DELTA_E_LIGHTNESS_BOUND``), float64 near the threshold. Scratch buffers
+    are kept for the last few image shapes, so steady-state calls allocate nothing.
+    Masks are uint8 (255 = match) and live in the kernel's buffers: they are
+    only valid until the next call on the same shape.
+    """
+
+    def __init__(self):
+        self._buffers = {}
+
+    def _scratch(self, shape):
+        scratch = self._buffers.get(shape)
+        if scratch is None:
+            if len(self._buffers) >= MAX_KERNEL_SHAPES: self._buffers.pop(next(iter(self._buffers)))
+            diff = np.empty(shape + (3,), dtype=np.uint8)
+            scratch = self._buffers[shape] = (diff, [np.empty(shape, dtype=np.uint8) for _ in range(3)],
+                                             np.empty(shape, dtype=np.int32), np.empty(shape, dtype=np.int32), np.empty(shape, dtype=np.uint8))
+        return scratch
+
+    def lab(self, image_lab, target_lab, tolerance):
+        diff, channels, total, square, mask = self._scratch(image_lab.shape[:2])
+        cv2.absdiff(image_lab, (float(target_lab[0]), float(target_lab[1]), float(target_lab[2]), 0.0), dst=diff)
+        cv2.split(diff, channels)
+        cv2.LUT(channels[0], SQUARES, dst=total)
+        for channel in channels[1:]: cv2.LUT(channel, SQUARES, dst=square); np.add(total, square, out=total)
+        if total.size <= OPENCV_SCALAR_SIZE: mask[...] = np.where(total <= int(tolerance) ** 2, 255, 0); return mask
+        return cv2.compare(total, float(int(tolerance) ** 2), cv2.CMP_LE, dst=mask)
+
+    def rgb(self, np_image, target_rgb, tolerance):
+        """``target_rgb`` in the image's channel order; a 4th (alpha) channel is ignored."""
+        mask = self._scratch(np_image.shape[:2])[-1]
+        lower = [c - int(tolerance) for c in target_rgb] + [0] * (np_image.shape[2] - 3)
+        upper = [c + int(tolerance) for c in target_rgb] + [255] * (np_image.shape[2] - 3)
+        return cv2.inRange(np_image, np.array(lower, dtype=np.float64), np.array(upper, dtype=np.float64), dst=mask)
+
+    def delta_e(self, image_cielab, reference, metric, tolerance):
+        """``image_cielab`` and ``reference`` in float CIE L*a*b* (see ``colorspace.to_cielab``)."""
+        mask = self._scratch(image_cielab.shape[:2])[-1]
+        limit = float(tolerance) ** 2
+        lightness = image_cielab[..., 0]
+        candidates = np.abs(lightness - np.float32(reference[0])) <= float(tolerance) * DELTA_E_LIGHTNESS_BOUND[metric] + DELTA_E_RECHECK
+        mask.fill(0)
+        pixels = image_cielab[candidates]
+        distance = DELTA_E_SQ[metric](pixels, reference, np.float32)
+        # float32 is exact enough everywhere but right at the threshold; settle those in float64.
+        close = np.abs(distance - limit) <= DELTA_E_RECHECK * (limit + 1)
+        if close.any(): distance[close] = DELTA_E_SQ[metric](pixels[close], reference)
+        mask[candidates] = np.where(distance <= limit, 255, 0)
+        return mask
+
+    def mask(self, np_image, image_lab, target, order="RGB", image_cielab=None):
+        if target.metric == "LAB": return self.lab(image_lab, target.lab, target.tolerance)
+        if target.metric == "RGB": return self.rgb(np_image, target.rgb[::-1] if order == "BGR" else target.rgb, target.tolerance)
+        if target.metric in DELTA_E_SQ:
+            if image_cielab is None: image_cielab = to_cielab(np_image[..., :3], order)
+            return self.delta_e(image_cielab, rgb_to_cielab(target.rgb), target.metric, target.tolerance)
+        raise ValueError(f"Unknown match metric: {target.metric}")
+
+    def add_bits(self, labels, np_image, image_lab, target, bit, order="RGB", image_cielab=None):
+        """ORs ``1 << bit`` into ``labels`` (uint8, in place) where ``target`` matches."""
+        mask = self.mask(np_image, image_lab, target, order, image_cielab)
+        if labels.size <= OPENCV_SCALAR_SIZE: labels[mask != 0] |= np.uint8(1 << bit); return
+        cv2.bitwise_or(labels, 1 << bit, dst=labels, mask=mask)
+
+
+def build_match_table(targets):
+    """Builds the full table for ``targets`` (a sequence of ``matcher.Target``)."""
+    if len(targets) > MAX_TARGETS: raise ValueError(f"At most {MAX_TARGETS} targets supported, got {len(targets)}")
+    table = np.zeros(TABLE_SIZE, dtype=np.uint8)
+    needs_lab = any(t.metric == "LAB" for t in targets)
+    needs_cielab = any(t.metric in DELTA_E_SQ for t in targets)
+    plane_lab = np.empty((256, 256, 3), dtype=np.uint8) if needs_lab else None
+    kernel = MaskKernel()
+    for r in range(256):
+        plane = _rgb_slice(r)
+        if needs_lab: rgb_to_lab_array(plane, out=plane_lab)
+        plane_cielab = to_cielab(plane) if needs_cielab else None
+        bits = table[r << 16:(r + 1) << 16].reshape(256, 256)
+        for i, target in enumerate(targets): kernel.add_bits(bits, plane, plane_lab, target, i, image_cielab=plane_cielab)
+    return table
+
+
+class MatchTable:
+    """Lookup table that is rebuilt on a background thread whenever its targets change.
+
+    ``request()`` is cheap and may be called every tick; ``lookup()`` returns None
+    until a table for the most recently requested targets is available, so
+    callers fall back to direct computation instead of waiting on the build.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key = None
+        self._built = (None, None)
+        self._builder = None
+
+    def request(self, targets):
+        key = tuple(targets)
+        with self._lock:
+            if key == self._key: return
+            self._key = key
+            if self._builder is None or not self._builder.is_alive():
+                self._builder = threading.Thread(target=self._build_loop, daemon=True)
+                self._builder.start()
+
+    def _build_loop(self):
+        while True:
+            with self._lock:
+                key = self._key
+                if key == self._built[0]: self._builder = None; return
+            try:
+                table = build_match_table(key)
+            except Exception as e:
+                print(f"Error building match table: {e}"); traceback.print_exc()
+                with self._lock: self._builder = None
+                return
+            with self._lock: self._built = (key, table)
+
+    def current(self):
+        """Returns the table for the latest requested targets, or None while it is being built."""
+        built_key, table = self._built
+        return table if table is not None and built_key == self._key else None
+
+    def is_ready(self):
+        return self.current() is not None
+
+    def lookup(self, np_image_rgb):
+        """Returns the HxW uint8 match bitmask for ``np_image_rgb``, or None if the table is stale."""
+        table = self.current()
+        return None if table is None else table[pack_rgb(np_image_rgb)]
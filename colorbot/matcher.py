@@ -0,0 +1,123 @@
+"""Single-pass matching of a frame against any number of target colors."""
+import collections
+
+import numpy as np
+
+from .colorspace import DELTA_E_SQ, bgr_to_lab_array, rgb_to_lab, rgb_to_lab_array, to_cielab
+from .lut import MAX_TARGETS, MaskKernel, MatchTable, pack_bgra
+
+METRICS = ("LAB", "RGB") + tuple(DELTA_E_SQ)
+
+
+class Target(collections.namedtuple('Target', 'rgb tolerance metric')):
+    """A color to match: ``rgb`` triple, ``tolerance`` and ``metric``.
+
+    "LAB" is Euclidean distance (ΔE76) in OpenCV's 8-bit LAB, "RGB" a per-channel
+    box, "DE94"/"DE2000" the CIE94/CIEDE2000 differences in true CIE L*a*b*.
+    """
+    __slots__ = ()
+
+    def __new__(cls, rgb, tolerance, metric="LAB"):
+        if metric not in METRICS: raise ValueError(f"Unknown match metric: {metric}")
+        return super().__new__(cls, tuple(int(c) for c in rgb), int(tolerance), metric)
+
+    @property
+    def lab(self):
+        return rgb_to_lab(self.rgb)
+
+
+MatchResult = collections.namedtuple('MatchResult', 'labels counts percentages')
+MatchResult.__doc__ = """``labels`` is an HxW uint8 image with bit ``i`` set where target ``i`` matched."""
+
+
+class ColorMatcher:
+    """Matches frames against N targets in one pass.
+
+    Once the lookup table for the current targets is built, a frame costs one
+    gather plus one histogram no matter how many targets there are; per-target
+    counts are read off the 256-bin label histogram. With ``use_table=False``
+    the table is never built and every frame is matched directly.
+
+    Targets listed as ``pixel_only`` in ``set_targets`` are only ever needed
+    through ``match_pixel``: frames matched directly (before the table is
+    ready) leave their bits clear instead of running their metric, which for
+    ΔE2000 costs several times a whole LAB match.
+    """
+
+    def __init__(self, targets=(), use_table=True):
+        self.table = MatchTable()
+        self.use_table = use_table
+        self.targets = ()
+        self.pixel_only_bits = 0
+        self._kernel = MaskKernel()
+        self._bit_matrix = np.zeros((256, 0), dtype=np.int64)
+        self.set_targets(targets)
+
+    def set_targets(self, targets, pixel_only=()):
+        """Replaces the targets; ``pixel_only`` are indices of targets only read through ``match_pixel``."""
+        targets = tuple(targets)
+        self.pixel_only_bits = sum(1 << i for i in set(pixel_only))
+        if targets == self.targets: return
+        if len(targets) > MAX_TARGETS: raise ValueError(f"At most {MAX_TARGETS} targets supported, got {len(targets)}")
+        values = np.arange(256)[:, None]
+        self._bit_matrix = ((values >> np.arange(len(targets))[None, :]) & 1).astype(np.int64)
+        self.targets = targets
+        if targets and self.use_table: self.table.request(targets)
+
+    def _labels_direct(self, np_image, order="RGB", skip_bits=0):
+        """Per-target masks without the table, except targets in ``skip_bits``; ``order="BGR"`` also accepts BGRA."""
+        labels = np.zeros(np_image.shape[:2], dtype=np.uint8)
+        targets = [(i, t) for i, t in enumerate(self.targets) if not skip_bits >> i & 1]
+        image_lab = image_cielab = None
+        if any(t.metric == "LAB" for _, t in targets):
+            image_lab = bgr_to_lab_array(np_image) if order == "BGR" else rgb_to_lab_array(np_image)
+        if any(t.metric in DELTA_E_SQ for _, t in targets): image_cielab = to_cielab(np_image[..., :3], order)
+        for i, target in targets: self._kernel.add_bits(labels, np_image, image_lab, target, i, order, image_cielab)
+        return labels
+
+    def labels(self, np_image_rgb):
+        labels = self.table.lookup(np_image_rgb)
+        return labels if labels is not None else self._labels_direct(np_image_rgb, skip_bits=self.pixel_only_bits)
+
+    def labels_bgra(self, np_image_bgra):
+        """Label image straight from an HxWx4 BGRA buffer (e.g. a view over mss ``raw``), no RGB copy."""
+        table = self.table.current()
+        if table is not None: return table[pack_bgra(np_image_bgra)]
+        return self._labels_direct(np_image_bgra, "BGR", self.pixel_only_bits)
+
+    def counts(self, labels):
+        """Per-target match counts for a label image."""
+        histogram = np.bincount(labels.ravel(), minlength=256)
+        return histogram @ self._bit_matrix
+
+    def from_labels(self, labels):
+        """MatchResult (counts and percentages) for an already computed label image."""
+        counts = self.counts(labels)
+        total = labels.size
+        percentages = counts * (100.0 / total) if total > 0 else np.zeros(len(self.targets))
+        return MatchResult(labels, counts, percentages)
+
+    def match(self, np_image_rgb):
+        return self.from_labels(self.labels(np_image_rgb))
+
+    def match_bgra(self, np_image_bgra):
+        return self.from_labels(self.labels_bgra(np_image_bgra))
+
+    def match_pixel(self, rgb):
+        """Match bitmask for a single RGB color."""
+        table = self.table.current()
+        if table is not None: return int(table[(int(rgb[0]) << 16) | (int(rgb[1]) << 8) | int(rgb[2])])
+        return int(self._labels_direct(np.uint8([[rgb]]))[0, 0])
+
+    def overlay(self, np_image_rgb, labels, colors):
+        """Paints matched pixels with ``colors[i]``; where several targets match, the highest index wins."""
+        palette = np.zeros((256, 3), dtype=np.uint8)
+        painted = np.zeros(256, dtype=bool)
+        for i, color in enumerate(colors):
+            if color is None: continue
+            hit = (np.arange(256) >> i) & 1 == 1
+            palette[hit] = color; painted |= hit
+        overlay = np_image_rgb.copy()
+        mask = painted[labels]
+        overlay[mask] = palette[labels[mask]]
+        return overlay
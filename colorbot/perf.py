@@ -0,0 +1,155 @@
+"""Per-stage latency instrumentation for the worker loop.
+
+Every stage keeps its last ``capacity`` samples in a fixed-size ring, so
+recording a sample is two list stores and never allocates. Each ring has a
+single writer thread (worker stages on the worker, "dominant" on the analysis
+thread); readers (the Performance tab, ``PerfExporter``) copy a snapshot and
+tolerate the occasional sample being overwritten mid-read.
+"""
+import array
+import csv
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CAPACITY = 2048
+HISTOGRAM_EDGES_MS = (0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50)
+TICK_STAGE = "tick"
+EXPORT_FORMATS = ("csv", "jsonl")
+DEFAULT_EXPORT_INTERVAL = 0.25
+
+
+class StageRing:
+    """(end time, duration) of the last ``capacity`` samples of one stage, in ``time.perf_counter`` seconds."""
+
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.ends = array.array('d', bytes(8 * capacity))
+        self.durations = array.array('d', bytes(8 * capacity))
+        self.total = 0
+
+    def add(self, end, duration):
+        i = self.total % self.capacity
+        self.ends[i] = end; self.durations[i] = duration
+        self.total += 1
+
+    def since(self, last_total):
+        """Samples recorded after ``last_total`` in order: (ends, durations, new total, samples lost to overwrite)."""
+        total = self.total
+        first = max(last_total, total - self.capacity)
+        index = np.arange(first, total) % self.capacity
+        return np.frombuffer(self.ends)[index], np.frombuffer(self.durations)[index], total, first - last_total
+
+    def recent(self):
+        """Durations of the samples currently held (unordered)."""
+        return np.frombuffer(self.durations)[:min(self.total, self.capacity)].copy()
+
+
+class PerfMonitor:
+    """Named stage timers backed by ``StageRing`` buffers.
+
+    Stages chain: ``t = monitor.mark("cursor", t)`` records the time since ``t``
+    and returns the current time as the start of the next stage. The worker
+    marks ``TICK_STAGE`` once per iteration, from which ``rate()`` derives the
+    achieved tick rate.
+    """
+
+    def __init__(self, capacity=DEFAULT_CAPACITY, enabled=True):
+        self.capacity, self.enabled = capacity, enabled
+        self.rings = {}
+
+    def ring(self, stage):
+        ring = self.rings.get(stage)
+        if ring is None: ring = self.rings[stage] = StageRing(self.capacity)
+        return ring
+
+    def mark(self, stage, start):
+        now = time.perf_counter()
+        if self.enabled: self.ring(stage).add(now, now - start)
+        return now
+
+    def add(self, stage, duration, end=None):
+        if self.enabled: self.ring(stage).add(time.perf_counter() if end is None else end, duration)
+
+    def reset(self):
+        self.rings = {}
+
+    def rate(self, stage=TICK_STAGE, window=1.0):
+        """Samples per second of ``stage`` over the last ``window`` seconds."""
+        ring = self.rings.get(stage)
+        if ring is None or not ring.total: return 0.0
+        ends = np.frombuffer(ring.ends)[:min(ring.total, ring.capacity)].copy()
+        recent = ends[ends >= time.perf_counter() - window]
+        if len(recent) < 2: return 0.0
+        # A ring that holds less than ``window`` of history measures over the span it has.
+        if len(recent) == len(ends): return (len(recent) - 1) / max(recent.max() - recent.min(), 1e-9)
+        return len(recent) / window
+
+    def stats(self):
+        """Per-stage summary of the samples held: count, total, mean/p50/p99/max in ms and a histogram over ``HISTOGRAM_EDGES_MS``."""
+        summary = {}
+        for stage, ring in list(self.rings.items()):
+            durations_ms = ring.recent() * 1000
+            if not len(durations_ms): continue
+            histogram = np.bincount(np.searchsorted(HISTOGRAM_EDGES_MS, durations_ms), minlength=len(HISTOGRAM_EDGES_MS) + 1)
+            summary[stage] = {"count": len(durations_ms), "total": ring.total, "mean_ms": float(durations_ms.mean()),
+                              "p50_ms": float(np.percentile(durations_ms, 50)), "p99_ms": float(np.percentile(durations_ms, 99)),
+                              "max_ms": float(durations_ms.max()), "histogram": histogram.tolist()}
+        return summary
+
+
+class PerfExporter:
+    """Streams every recorded sample of a ``PerfMonitor`` to a CSV or JSON-lines file.
+
+    A background thread collects new ring samples every ``interval`` seconds,
+    so the worker pays nothing for exporting. Rows are ``time`` (Unix seconds),
+    ``stage`` and ``ms``; samples overwritten before the thread got to them are
+    counted in ``lost``.
+    """
+
+    def __init__(self, monitor, path, fmt=None, interval=DEFAULT_EXPORT_INTERVAL):
+        self.monitor, self.path, self.interval = monitor, path, interval
+        self.fmt = fmt or ("jsonl" if path.endswith((".jsonl", ".json")) else "csv")
+        if self.fmt not in EXPORT_FORMATS: raise ValueError(f"Unknown export format: {self.fmt}")
+        self.exported = self.lost = 0
+        self._seen = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._file = None
+
+    def start(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._file = open(self.path, 'w', newline='')
+        self._csv = csv.writer(self._file) if self.fmt == "csv" else None
+        if self._csv: self._csv.writerow(("time", "stage", "ms"))
+        # Ring timestamps are perf_counter seconds; rows carry wall-clock time.
+        self._clock_offset = time.time() - time.perf_counter()
+        self._seen = {stage: ring.total for stage, ring in list(self.monitor.rings.items())}
+        self._thread = threading.Thread(target=self._run, name="perf-exporter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread: self._thread.join()
+        if self._file: self._file.close(); self._file = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval): self._collect()
+        self._collect()
+
+    def _collect(self):
+        batch = []
+        for stage, ring in list(self.monitor.rings.items()):
+            ends, durations, total, lost = ring.since(self._seen.get(stage, 0))
+            self._seen[stage] = total; self.lost += lost
+            batch.extend(zip(ends.tolist(), [stage] * len(ends), (durations * 1000).tolist()))
+        batch.sort()
+        for end, stage, ms in batch:
+            if self._csv: self._csv.writerow((f"{end + self._clock_offset:.6f}", stage, f"{ms:.4f}"))
+            else: self._file.write(json.dumps({"time": round(end + self._clock_offset, 6), "stage": stage, "ms": round(ms, 4)}) + "\n")
+        self._file.flush()
+        self.exported += len(batch)
@@ -0,0 +1,110 @@
+"""Lazily rendered screen image for the color picker.
+
+The picker used to convert the whole virtual desktop to an RGB array and a
+PIL image and show it as one Tk photo image, which on large multi-monitor
+setups costs hundreds of MB and seconds before the window opens.
+``ScreenTiles`` keeps only the BGRA grab (the capture's own buffer) and
+converts square tiles on request; pixel reads go straight to the grab.
+``CanvasTiles`` places photo images on a canvas only for the tiles in view
+and drops those that scroll away, so Tk memory follows the window size, not
+the desktop size. ``ScreenTiles.loupe`` renders a magnified or, through a
+pyramid of half-size copies built on first use, reduced view around a point.
+"""
+import cv2
+import numpy as np
+
+DEFAULT_TILE_SIZE = 256
+DEFAULT_LOUPE_SIZE = 160
+LOUPE_ZOOMS = (0.125, 0.25, 0.5, 1, 2, 4, 8, 16)
+LOUPE_MARKER = (255, 0, 255)
+TILE_MARGIN = 1  # tiles kept around the view, so short pans do not re-render
+
+
+class ScreenTiles:
+    """RGB tiles, pixels and loupe views of one BGRA screen grab."""
+
+    def __init__(self, frame_bgra, tile_size=DEFAULT_TILE_SIZE):
+        self.frame, self.tile_size = frame_bgra, tile_size
+        self.height, self.width = frame_bgra.shape[:2]
+        self.rows, self.cols = -(-self.height // tile_size), -(-self.width // tile_size)
+        self.pyramid = [frame_bgra]
+        self.converted = 0
+
+    def pixel_rgb(self, x, y):
+        """RGB tuple at (x, y), clamped to the image."""
+        x, y = min(max(int(x), 0), self.width - 1), min(max(int(y), 0), self.height - 1)
+        b, g, r = self.frame[y, x, :3]
+        return int(r), int(g), int(b)
+
+    def tile_range(self, left, top, right, bottom, margin=0):
+        """(row, col) of the tiles overlapping the half-open rectangle, widened by ``margin`` tiles."""
+        size = self.tile_size
+        rows = range(max(0, int(top) // size - margin), min(self.rows, -(-int(bottom) // size) + margin))
+        cols = range(max(0, int(left) // size - margin), min(self.cols, -(-int(right) // size) + margin))
+        return [(r, c) for r in rows for c in cols]
+
+    def tile_rgb(self, row, col):
+        """RGB copy of one tile (edge tiles are smaller)."""
+        size = self.tile_size
+        self.converted += 1
+        return cv2.cvtColor(self.frame[row * size:(row + 1) * size, col * size:(col + 1) * size], cv2.COLOR_BGRA2RGB)
+
+    def level(self, n):
+        """The grab reduced 2**n times, built from the previous level on first use."""
+        while len(self.pyramid) <= n:
+            previous = self.pyramid[-1]
+            if min(previous.shape[:2]) < 2: break
+            self.pyramid.append(cv2.resize(previous, (previous.shape[1] // 2, previous.shape[0] // 2), interpolation=cv2.INTER_AREA))
+        return self.pyramid[min(n, len(self.pyramid) - 1)]
+
+    def loupe(self, x, y, zoom, size=DEFAULT_LOUPE_SIZE):
+        """``size`` x ``size`` RGB view centered on (x, y), magnified ``zoom`` times; off-image parts are black.
+
+        Zooms of 1 and above enlarge a crop of the grab without smoothing,
+        with the center pixel outlined; zooms below 1 crop the matching
+        pyramid level, so a reduced view costs no full-image resize.
+        """
+        if zoom >= 1: source, scale, crop = self.frame, 1, -(-size // int(zoom))
+        else:
+            n = int(round(np.log2(1 / zoom)))
+            source = self.level(n); scale = self.width / source.shape[1]; crop = size
+        cx, cy = int(x / scale), int(y / scale)
+        half = crop // 2
+        patch = np.zeros((crop, crop, 3), dtype=np.uint8)
+        top, left = cy - half, cx - half
+        y0, y1, x0, x1 = max(top, 0), min(top + crop, source.shape[0]), max(left, 0), min(left + crop, source.shape[1])
+        if y0 < y1 and x0 < x1: patch[y0 - top:y1 - top, x0 - left:x1 - left] = cv2.cvtColor(source[y0:y1, x0:x1], cv2.COLOR_BGRA2RGB)
+        if zoom < 1: return patch
+        view = cv2.resize(patch, (crop * int(zoom), crop * int(zoom)), interpolation=cv2.INTER_NEAREST)[:size, :size]
+        if zoom >= 4:
+            z = int(zoom)
+            cv2.rectangle(view, (half * z - 1, half * z - 1), (half * z + z, half * z + z), LOUPE_MARKER, 1)
+        return np.ascontiguousarray(view)
+
+
+class CanvasTiles:
+    """Photo images on ``canvas`` for the tiles of ``tiles`` currently in view.
+
+    Call ``render`` whenever the view may have changed (scrolling, resizing);
+    calls are cheap when the visible tile set is unchanged.
+    """
+
+    def __init__(self, canvas, tiles, margin=TILE_MARGIN):
+        self.canvas, self.tiles, self.margin = canvas, tiles, margin
+        self.items = {}  # (row, col) -> (canvas item, photo image)
+        canvas.configure(scrollregion=(0, 0, tiles.width, tiles.height))
+
+    def render(self):
+        from PIL import Image, ImageTk
+        canvas, size = self.canvas, self.tiles.tile_size
+        left, top = canvas.canvasx(0), canvas.canvasy(0)
+        wanted = set(self.tiles.tile_range(left, top, left + canvas.winfo_width(), top + canvas.winfo_height(), self.margin))
+        for key in [key for key in self.items if key not in wanted]:
+            canvas.delete(self.items.pop(key)[0])
+        for row, col in wanted - self.items.keys():
+            photo = ImageTk.PhotoImage(Image.fromarray(self.tiles.tile_rgb(row, col)))
+            self.items[(row, col)] = (canvas.create_image(col * size, row * size, anchor='nw', image=photo), photo)
+
+    def close(self):
+        for item, _ in self.items.values(): self.canvas.delete(item)
+        self.items.clear()
@@ -0,0 +1,101 @@
+"""Bounded hand-off between the worker stages and their consumers.
+
+The worker runs capture -> match on its own thread and publishes results;
+slower consumers (the Tk UI, dominant-color analysis) only ever see the
+newest item. Publishing over an item nobody took drops the older one, so
+memory and consumer work stay constant however fast the worker runs.
+"""
+import collections
+import threading
+import traceback
+import zlib
+
+import numpy as np
+
+
+def frame_fingerprint(np_image):
+    """Cheap content fingerprint of a frame (CRC32 over its bytes)."""
+    return zlib.crc32(np.ascontiguousarray(np_image))
+
+
+class LatestSlot:
+    """Single-item mailbox with drop-oldest semantics."""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._item = None
+        self._pending = False
+        self.published = 0
+        self.dropped = 0
+
+    def publish(self, item):
+        with self._cond:
+            if self._pending: self.dropped += 1
+            self._item, self._pending = item, True
+            self.published += 1
+            self._cond.notify()
+
+    def take(self, timeout=0):
+        """Returns the newest unconsumed item, waiting up to ``timeout`` seconds; None if there is none."""
+        with self._cond:
+            if not self._pending and timeout: self._cond.wait(timeout)
+            if not self._pending: return None
+            item, self._item, self._pending = self._item, None, False
+            return item
+
+    def pending(self):
+        return int(self._pending)
+
+
+class LatestSlots:
+    """A LatestSlot per message ``type``, so e.g. a stats update never displaces a preview frame."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._slots = collections.OrderedDict()
+
+    def publish(self, message):
+        msg_type = message.get("type")
+        slot = self._slots.get(msg_type)
+        if slot is None:
+            with self._lock: slot = self._slots.setdefault(msg_type, LatestSlot())
+        slot.publish(message)
+
+    def drain(self):
+        """Newest message of every type that has one pending."""
+        messages = (slot.take() for slot in list(self._slots.values()))
+        return [m for m in messages if m is not None]
+
+    @property
+    def published(self): return sum(slot.published for slot in list(self._slots.values()))
+
+    @property
+    def dropped(self): return sum(slot.dropped for slot in list(self._slots.values()))
+
+    def pending(self):
+        return sum(slot._pending for slot in list(self._slots.values()))
+
+
+class SlotStage:
+    """Runs ``fn`` on a thread over the newest item of ``source``, passing non-None results to ``publish``."""
+
+    def __init__(self, name, fn, source, publish, stop_event, poll_interval=0.1):
+        self.name, self.fn, self.source, self.publish = name, fn, source, publish
+        self.stop_event, self.poll_interval = stop_event, poll_interval
+        self.thread = None
+
+    def start(self):
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+
+    def join(self, timeout=None):
+        if self.thread: self.thread.join(timeout)
+
+    def _run(self):
+        while not self.stop_event.is_set():
+            item = self.source.take(timeout=self.poll_interval)
+            if item is None: continue
+            try: result = self.fn(item)
+            except Exception as e: print(f"Stage '{self.name}' error: {e}"); traceback.print_exc(); continue
+            if result is not None: self.publish(result)
@@ -0,0 +1,74 @@
+"""Preview frames scaled for the GUI without per-frame allocations.
+
+``fit_size`` is the thumbnail size of a frame (aspect kept, never enlarged).
+``PreviewResizer`` scales each named source (capture, overlay) once per
+target size with OpenCV's area interpolation into buffers it keeps, so
+panels of the same size share one resize. ``PhotoPreview`` owns the Tk
+photo image of one label and pastes new pixels into it; a new photo image is
+only created when the fitted size changes (i.e. the capture box was resized).
+"""
+import cv2
+import numpy as np
+
+MAX_BUFFERS = 8  # the box size slider produces a new fitted size per step; keep only the recent ones
+
+
+def fit_size(shape, target_size):
+    """(width, height) of an HxW(xC) ``shape`` scaled down to fit ``target_size`` (width, height), aspect ratio kept."""
+    height, width = shape[:2]
+    scale = min(1.0, target_size[0] / width, target_size[1] / height)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class PreviewResizer:
+    """Resizes named sources into reused buffers, once per (source, size)."""
+
+    def __init__(self, interpolation=cv2.INTER_AREA):
+        self.interpolation = interpolation
+        self.buffers = {}
+        self.latest = {}
+        self.resized = 0
+
+    def resize(self, name, image, size):
+        """``image`` scaled to ``size`` (width, height); the result is overwritten by the next ``name`` source of that size."""
+        if (image.shape[1], image.shape[0]) == tuple(size): return image
+        key = (name, tuple(size))
+        source, result = self.latest.get(key, (None, None))
+        if source is image: return result
+        buffer = self.buffers.get(key)
+        if buffer is None or buffer.shape[2:] != image.shape[2:]:
+            while len(self.buffers) >= MAX_BUFFERS:
+                oldest = next(iter(self.buffers)); del self.buffers[oldest]; self.latest.pop(oldest, None)
+            buffer = self.buffers[key] = np.empty((size[1], size[0]) + image.shape[2:], dtype=image.dtype)
+        cv2.resize(image, tuple(size), dst=buffer, interpolation=self.interpolation)
+        self.latest[key] = (image, buffer); self.resized += 1
+        return buffer
+
+    def clear(self):
+        self.latest.clear()
+
+
+class PhotoPreview:
+    """The preview shown in one Tk label, updated in place.
+
+    ``size`` is the (width, height) box the frame is fitted into; the label
+    keeps that size while it shows nothing.
+    """
+
+    def __init__(self, label, size, resizer):
+        self.label, self.size, self.resizer = label, tuple(size), resizer
+        self.photo = self.photo_size = None
+
+    def show(self, name, image):
+        if image is None or image.size == 0: self.clear(); return
+        from PIL import Image, ImageTk
+        fitted = fit_size(image.shape, self.size)
+        pixels = self.resizer.resize(name, image, fitted)
+        if self.photo is None or self.photo_size != fitted:
+            self.photo, self.photo_size = ImageTk.PhotoImage("RGB", fitted, width=fitted[0], height=fitted[1]), fitted
+            self.label.config(image=self.photo, width=fitted[0], height=fitted[1])
+        self.photo.paste(Image.fromarray(pixels))
+
+    def clear(self):
+        if self.photo is None: return
+        self.label.config(image='', width=self.size[0], height=self.size[1]); self.photo = self.photo_size = None
@@ -0,0 +1,189 @@
+"""The detection worker in a child process, isolated from the GUI's GIL.
+
+``EngineProcess`` starts ``DetectionWorker`` in a spawned process that owns
+the capture, the engine and the clicks. Settings, window state and export
+requests go down a one-way control pipe. Results come back up a second pipe
+as batches, sent at most every ``send_interval`` seconds and holding only the
+newest message of each type. Preview images do not go through the pipe:
+they are written into a ``FrameRing`` in shared memory, and the message
+carries only the (slot, sequence) to read them from.
+"""
+import multiprocessing
+import threading
+import traceback
+
+import numpy as np
+
+from .pipeline import LatestSlots
+from .worker import RECORDING_STOP_TIMEOUT, create_worker
+
+FRAME_RING_SLOTS = 3
+DEFAULT_MAX_FRAME = (600, 600)
+DEFAULT_SEND_INTERVAL = 0.02
+RING_IMAGES = 2  # capture and overlay
+RING_HEADER_FIELDS = 4  # sequence, height, width, bitmask of present images
+
+
+class FrameRing:
+    """Slots of up to ``max_size`` RGB image pairs (capture, overlay) in one shared memory block.
+
+    Slots are written round-robin without locks. The writer makes a slot's
+    sequence odd while it writes and even when it is done. A reader copies
+    the images out and discards them if the sequence is not the one it was
+    told, i.e. the writer has lapped the ring. Neither side ever waits.
+    """
+
+    def __init__(self, slots=FRAME_RING_SLOTS, max_size=DEFAULT_MAX_FRAME, name=None):
+        from multiprocessing import shared_memory
+        self.slots, self.max_size = slots, tuple(max_size)
+        self.image_bytes = self.max_size[0] * self.max_size[1] * 3
+        header_bytes = slots * RING_HEADER_FIELDS * 8
+        self.owner = name is None
+        if self.owner: self.shm = shared_memory.SharedMemory(create=True, size=header_bytes + slots * RING_IMAGES * self.image_bytes)
+        else: self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.headers = np.ndarray((slots, RING_HEADER_FIELDS), dtype=np.int64, buffer=self.shm.buf)
+        self.data = np.ndarray((slots, RING_IMAGES, self.image_bytes), dtype=np.uint8, buffer=self.shm.buf, offset=header_bytes)
+        self.next_slot = 0
+
+    def write(self, images):
+        """Stores same-shaped HxWx3 uint8 ``images`` (None entries allowed); returns (slot, sequence), or None if they do not fit."""
+        present = [image for image in images if image is not None]
+        if not present: return None
+        height, width = present[0].shape[:2]
+        if height * width * 3 > self.image_bytes or len(images) > RING_IMAGES: return None
+        slot = self.next_slot; self.next_slot = (slot + 1) % self.slots
+        header = self.headers[slot]
+        sequence = int(header[0]) + 1
+        header[0] = sequence
+        for i, image in enumerate(images):
+            if image is not None: self.data[slot, i, :height * width * 3].reshape(height, width, 3)[:] = image
+        header[1:] = height, width, sum(1 << i for i, image in enumerate(images) if image is not None)
+        header[0] = sequence + 1
+        return slot, sequence + 1
+
+    def read(self, slot, sequence):
+        """Copies of the images written as (slot, sequence), or None if the slot has been overwritten since."""
+        header = self.headers[slot]
+        if header[0] != sequence: return None
+        height, width, present = (int(v) for v in header[1:])
+        images = [self.data[slot, i, :height * width * 3].reshape(height, width, 3).copy() if present >> i & 1 else None for i in range(RING_IMAGES)]
+        return images if header[0] == sequence else None
+
+    def close(self):
+        self.headers = self.data = None
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+
+def _control_loop(conn, worker):
+    while True:
+        try: message = conn.recv()
+        except (EOFError, OSError): break
+        kind = message[0]
+        if kind == "config": worker.config = message[1]
+        elif kind == "window": worker.window_tracker.update(*message[1])
+        elif kind == "export": worker.set_export(message[1], message[2])
+        elif kind == "stop": break
+    worker.stop_event.set()
+
+
+def _send_loop(conn, outbox, ring, stop_event, interval):
+    while not stop_event.wait(interval):
+        batch = []
+        for message in outbox.drain():
+            if message.get("type") == "preview":
+                frame = ring.write((message.get("capture_img"), message.get("overlay_img")))
+                if frame is not None: message = {"type": "preview", "frame": frame}
+            batch.append(message)
+        if not batch: continue
+        try: conn.send(batch)
+        except (OSError, EOFError): stop_event.set(); break
+
+
+def _engine_main(control, results, ring_name, ring_slots, max_frame, send_interval, options):
+    ring = FrameRing(ring_slots, max_frame, name=ring_name)
+    outbox = LatestSlots()
+    worker = create_worker(outbox.publish, **options)
+    threading.Thread(target=_control_loop, args=(control, worker), name="engine-control", daemon=True).start()
+    sender = threading.Thread(target=_send_loop, args=(results, outbox, ring, worker.stop_event, send_interval), name="engine-sender", daemon=True)
+    sender.start()
+    try: worker.run()
+    except Exception as e: print(f"Engine process error: {e}"); traceback.print_exc()
+    finally:
+        worker.stop_event.set(); sender.join(1.0)
+        if worker.analysis_stage: worker.analysis_stage.join(1.0)
+        ring.close(); results.close()
+
+
+class EngineProcess:
+    """A DetectionWorker in a spawned child process; same interface as ``worker.EngineThread``.
+
+    ``options`` are those of ``worker.create_worker`` and must be picklable.
+    Messages from the child reach ``publish`` on a receiver thread, with
+    preview images already copied out of the ring. Previews the child
+    overwrote before they were read are counted in ``torn_frames``.
+    """
+
+    def __init__(self, publish, ring_slots=FRAME_RING_SLOTS, max_frame=DEFAULT_MAX_FRAME, send_interval=DEFAULT_SEND_INTERVAL, **options):
+        self.publish = publish
+        self.ring = FrameRing(ring_slots, max_frame)
+        context = multiprocessing.get_context("spawn")
+        self._control_end, self._control = context.Pipe(duplex=False)
+        self._results, self._results_end = context.Pipe(duplex=False)
+        self.process = context.Process(target=_engine_main, name="detection-engine", daemon=True,
+                                       args=(self._control_end, self._results_end, self.ring.name, ring_slots, max_frame, send_interval, options))
+        self._receiver = None
+        # The Tk thread and the hotkey thread both send; Connection.send is not thread-safe.
+        self._send_lock = threading.Lock()
+        self._stopping = False
+        self.recording_seen = False
+        self.torn_frames = 0
+
+    def start(self, config=None):
+        self.process.start(); print(f"Engine process started (pid {self.process.pid}).")
+        # The child holds its own copies of these ends; closing ours lets recv() see EOF when it exits.
+        self._control_end.close(); self._results_end.close()
+        if config is not None: self.configure(config)
+        self._receiver = threading.Thread(target=self._receive, name="engine-receiver", daemon=True)
+        self._receiver.start()
+        return self
+
+    def _send(self, *message):
+        try:
+            with self._send_lock: self._control.send(message)
+        except (OSError, EOFError) as e: print(f"Engine process control error: {e}")
+
+    def configure(self, config):
+        if getattr(config, "recording_enabled", False): self.recording_seen = True
+        self._send("config", config)
+
+    def update_window(self, state):
+        self._send("window", tuple(state))
+
+    def set_export(self, path, fmt=None):
+        self._send("export", path, fmt)
+
+    def _receive(self):
+        while True:
+            try: batch = self._results.recv()
+            except (EOFError, OSError): break
+            for message in batch:
+                if "frame" in message:
+                    images = self.ring.read(*message["frame"])
+                    if images is None: self.torn_frames += 1; continue
+                    message = {"type": "preview", "capture_img": images[0], "overlay_img": images[1]}
+                self.publish(message)
+        if not self._stopping: self.publish({"type": "error", "message": f"Engine process exited (code {self.process.exitcode})"})
+
+    def stop(self, timeout=0.5):
+        self._stopping = True
+        self._send("stop")
+        self.process.join(timeout)
+        if self.process.is_alive() and self.recording_seen:
+            # The child writes out any session recording before it exits; terminating it would cut the last chunks.
+            print("Waiting for the session recording to be written..."); self.process.join(RECORDING_STOP_TIMEOUT)
+        if self.process.is_alive(): print("Engine process did not stop in time, terminating."); self.process.terminate(); self.process.join(timeout)
+        if self._receiver: self._receiver.join(timeout)
+        self._control.close(); self._results.close()
+        self.ring.close()
@@ -0,0 +1,161 @@
+"""Session recording to the chunked on-disk format read by ``capture.ReplayCapture``."""
+import json
+import os
+import queue
+import threading
+import time
+import traceback
+import zipfile
+
+import numpy as np
+
+from .capture import RECORDING_CHUNK_PATTERN, RECORDING_INDEX, ReplayCapture
+from .lut import MAX_TARGETS
+
+DEFAULT_CHUNK_TICKS = 256
+DEFAULT_CHUNK_BYTES = 32 << 20  # a chunk is closed at this many frame bytes, so large boxes make short chunks
+DEFAULT_MAX_PENDING_BYTES = 128 << 20  # frame bytes queued for the writer before chunks are dropped
+
+
+class SessionRecorder:
+    """Records every tick (box, origin, cursor, timestamp, match result) on a writer thread.
+
+    ``record()`` only appends references to the current chunk; a chunk is
+    closed at ``chunk_ticks`` ticks or ``chunk_bytes`` frame bytes, then
+    packed, compressed and written by the writer thread, frame by frame. A
+    frame identical to the previous one at the same origin is stored as a
+    back-reference instead of again. If more than ``max_pending_bytes`` of
+    frames wait for the writer, whole chunks are dropped (counted in
+    ``dropped_ticks``) rather than stalling the caller or growing memory.
+
+    Frames must stay valid after the tick returns: pass ``engine.detach(frame)``
+    for captures that reuse their buffer.
+    """
+
+    def __init__(self, path, screen_size, metadata=None, chunk_ticks=DEFAULT_CHUNK_TICKS, chunk_bytes=DEFAULT_CHUNK_BYTES,
+                 max_pending_bytes=DEFAULT_MAX_PENDING_BYTES):
+        self.path, self.screen_size, self.metadata = path, tuple(screen_size), dict(metadata or {})
+        self.chunk_ticks, self.chunk_bytes, self.max_pending_bytes = chunk_ticks, chunk_bytes, max_pending_bytes
+        self._queue = queue.Queue()
+        self._pending = threading.Condition()
+        self._pending_bytes = 0  # frame bytes queued or being written
+        self._rows, self._row_bytes, self._chunk_no = [], 0, 0
+        self._last_key = None
+        self.recorded_ticks = self.dropped_ticks = 0
+        self._writer = None
+
+    def start(self):
+        os.makedirs(self.path, exist_ok=True)
+        self._write_index(complete=False)
+        self._writer = threading.Thread(target=self._write_loop, name="session-recorder", daemon=True)
+        self._writer.start()
+        return self
+
+    def record(self, timestamp, cursor, box_size, result):
+        """Appends one ``DetectionEngine.tick`` result."""
+        frame = result.frame
+        key = (result.origin, result.fingerprint) if frame is not None else None
+        repeat = key is not None and key == self._last_key
+        self._last_key = key
+        self._rows.append((timestamp, cursor, box_size, result.origin, None if repeat else frame, frame.shape[:2] if frame is not None else (0, 0),
+                           result.status, result.center_rgb, result.click, None if result.match is None else result.match.counts))
+        if not repeat and frame is not None: self._row_bytes += frame.nbytes
+        if len(self._rows) >= self.chunk_ticks or self._row_bytes >= self.chunk_bytes: self._flush()
+
+    def _flush(self, block=False):
+        if not self._rows: return
+        rows, size, self._rows, self._row_bytes = self._rows, self._row_bytes, [], 0
+        with self._pending:
+            if block: self._pending.wait_for(lambda: self._fits(size))
+            elif not self._fits(size):
+                self.dropped_ticks += len(rows)
+                self._last_key = None
+                return
+            self._pending_bytes += size
+        self._queue.put((self._chunk_no, rows, size)); self._chunk_no += 1
+
+    def _fits(self, size):
+        # An empty backlog always takes the chunk, so an oversized one is written rather than dropped forever.
+        return self._pending_bytes == 0 or self._pending_bytes + size <= self.max_pending_bytes
+
+    def stop(self):
+        """Writes the pending chunk and waits for the writer to finish.
+
+        The last chunk is queued even if the writer is behind: the ticks
+        just before stopping are the ones a reproduction needs most.
+        """
+        self._flush(block=self._writer is not None)
+        if self._writer is not None:
+            self._queue.put((None, None, 0)); self._writer.join(); self._writer = None
+        self._write_index(complete=True)
+
+    def _write_loop(self):
+        while True:
+            chunk_no, rows, size = self._queue.get()
+            if rows is None: return
+            try:
+                self._write_chunk(os.path.join(self.path, RECORDING_CHUNK_PATTERN.format(chunk_no)), rows)
+                self.recorded_ticks += len(rows)
+            except Exception as e:
+                print(f"Recorder Error (chunk {chunk_no}): {e}"); traceback.print_exc()
+                self.dropped_ticks += len(rows)
+            finally:
+                del rows
+                with self._pending: self._pending_bytes -= size; self._pending.notify_all()
+
+    @staticmethod
+    def _write_chunk(file_path, rows):
+        """Writes ``rows`` as an ``.npz`` archive (what ``np.savez_compressed`` produces), streaming ``pixels`` frame by frame."""
+        n = len(rows)
+        frames = [r[4] for r in rows if r[4] is not None]
+        offsets, offset = np.full(n, -1, dtype=np.int64), 0
+        for i, row in enumerate(rows):
+            if row[4] is not None: offsets[i] = offset; offset += row[4].size
+        counts = np.full((n, MAX_TARGETS), -1, dtype=np.int64)
+        center_rgbs = np.full((n, 3), -1, dtype=np.int16)
+        for i, row in enumerate(rows):
+            if row[9] is not None: counts[i, :len(row[9])] = row[9]
+            if row[7] is not None: center_rgbs[i] = row[7]
+        arrays = {
+            "timestamps": np.array([r[0] for r in rows], dtype=np.float64),
+            "cursors": np.array([r[1] for r in rows], dtype=np.int32).reshape(n, 2),
+            "box_sizes": np.array([r[2] for r in rows], dtype=np.int32),
+            "origins": np.array([r[3] if r[3] is not None else (0, 0) for r in rows], dtype=np.int32).reshape(n, 2),
+            "shapes": np.array([r[5] for r in rows], dtype=np.int32).reshape(n, 2),
+            "offsets": offsets,
+            "statuses": np.array([r[6] or "" for r in rows]),
+            "center_rgbs": center_rgbs,
+            "clicks": np.array([r[8] for r in rows], dtype=bool),
+            "counts": counts,
+        }
+        with zipfile.ZipFile(file_path, 'w', compression=zipfile.ZIP_DEFLATED, allowZip64=True) as archive:
+            for name, array in arrays.items():
+                with archive.open(name + '.npy', 'w', force_zip64=True) as f: np.lib.format.write_array(f, array, allow_pickle=False)
+            with archive.open('pixels.npy', 'w', force_zip64=True) as f:
+                np.lib.format.write_array_header_1_0(f, {'descr': np.lib.format.dtype_to_descr(np.dtype(np.uint8)), 'fortran_order': False, 'shape': (offset,)})
+                for frame in frames: f.write(np.ascontiguousarray(frame).reshape(-1))
+
+    def _write_index(self, complete):
+        index = {"screen_size": list(self.screen_size), "created": time.strftime("%Y-%m-%dT%H:%M:%S"), "chunk_ticks": self.chunk_ticks,
+                 "complete": complete, "recorded_ticks": self.recorded_ticks, "dropped_ticks": self.dropped_ticks, **self.metadata}
+        with open(os.path.join(self.path, RECORDING_INDEX), 'w') as f: json.dump(index, f, indent=4)
+
+
+def replay_session(path, engine_factory, colors=None, tolerance=None, click_method=None):
+    """Re-runs a recording through a fresh engine, yielding ``(record, TickResult)`` per tick.
+
+    ``engine_factory(capture)`` builds the engine (e.g. ``DetectionEngine``);
+    colors/tolerance/click_method default to the values stored in the index.
+    """
+    capture = ReplayCapture(path)
+    engine = engine_factory(capture)
+    index = capture.index
+    engine.configure([tuple(c) for c in (colors or index.get("colors", []))],
+                     tolerance if tolerance is not None else index.get("tolerance", 0),
+                     click_method or index.get("click_method", "LAB"))
+    while capture.advance():
+        record = capture.record
+        mouse_x, mouse_y = capture.cursor()
+        result = engine.tick(mouse_x, mouse_y, int(record["box_sizes"]), check_center=bool(record["center_rgbs"][0] >= 0),
+                             now=float(record["timestamps"]))
+        yield record, result
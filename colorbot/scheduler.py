@@ -0,0 +1,67 @@
+"""Fixed-rate tick scheduling for the worker loop with automatic idle backoff."""
+import time
+
+DEFAULT_IDLE_AFTER = 0.5
+DEFAULT_MAX_IDLE_INTERVAL = 0.05
+DEFAULT_SPIN_WINDOW = 0.0005
+
+
+class TickScheduler:
+    """Paces a loop at ``target_rate`` ticks per second.
+
+    Deadlines advance by whole periods, so the rate does not drift with tick
+    duration; a loop that falls more than a period behind is resynchronized
+    rather than allowed to burst. ``wait()`` sleeps until just before the
+    deadline and spins (yielding the GIL) only for the last ``spin_window``
+    seconds; pass ``spin_window=0`` to never busy-wait.
+
+    When ``note_activity(False)`` has been reported for ``idle_after`` seconds
+    the interval doubles each tick up to ``max_idle_interval``; the first
+    ``note_activity(True)`` restores the target rate immediately.
+    """
+
+    def __init__(self, target_rate, idle_after=DEFAULT_IDLE_AFTER, max_idle_interval=DEFAULT_MAX_IDLE_INTERVAL, spin_window=DEFAULT_SPIN_WINDOW):
+        self.idle_after, self.max_idle_interval, self.spin_window = idle_after, max_idle_interval, spin_window
+        self.period = self.interval = 1.0 / max(1.0, float(target_rate))
+        self._next_tick = None
+        self._last_change = time.perf_counter()
+
+    def set_target_rate(self, target_rate):
+        period = 1.0 / max(1.0, float(target_rate))
+        if period == self.period: return
+        self.period = period
+        self.interval = max(self.interval, period) if self.is_idle else period
+
+    @property
+    def is_idle(self):
+        return self.interval > self.period
+
+    def reset(self):
+        """Forgets the schedule, e.g. after a pause, and treats the next tick as active."""
+        self._next_tick = None
+        self._last_change = time.perf_counter()
+        self.interval = self.period
+
+    def note_activity(self, changed):
+        now = time.perf_counter()
+        if changed:
+            self._last_change = now; self.interval = self.period
+        elif now - self._last_change >= self.idle_after:
+            self.interval = min(self.interval * 2, max(self.max_idle_interval, self.period))
+
+    def wait(self, stop_event=None):
+        """Blocks until the next tick is due. Returns False if ``stop_event`` was set while waiting."""
+        now = time.perf_counter()
+        if self._next_tick is None or now - self._next_tick > self.interval: self._next_tick = now
+        self._next_tick += self.interval
+        coarse = self._next_tick - now - self.spin_window
+        if coarse > 0:
+            if stop_event is not None:
+                if stop_event.wait(coarse): return False
+            else: time.sleep(coarse)
+        if self.spin_window > 0:
+            while time.perf_counter() < self._next_tick: time.sleep(0)
+        else:
+            remaining = self._next_tick - time.perf_counter()
+            if remaining > 0: time.sleep(remaining)
+        return True
@@ -0,0 +1,125 @@
+"""Coarse-to-fine match statistics for large capture boxes.
+
+A full match costs one table gather per pixel, so a 600x600 box is four
+times the work of a 300x300 one although the UI only shows percentages.
+``TiledMatcher`` instead matches one randomly placed pixel per stride x stride
+cell of the frame (a jittered grid, so periodic 1-px UI patterns cannot alias
+with the sample; a few grids are drawn per frame size and cycled), splits the sample into square tiles and matches exactly
+the tiles whose sample is mixed (some pixels in, some out), most uncertain
+first, until a fixed per-frame pixel budget is spent. Budget left over goes
+to the remaining tiles in round-robin order across frames, so every tile is
+matched exactly every few frames. Tiles that are neither are extrapolated from
+their sample. The cost is bounded by the budget plus the sample, whatever the
+box size.
+"""
+import collections
+import itertools
+
+import numpy as np
+
+DEFAULT_TILE_SIZE = 64
+DEFAULT_SAMPLE_STRIDE = 4
+DEFAULT_EXACT_BUDGET = 256 * 256
+JITTER_GRIDS = 8  # jittered sample grids drawn per frame size, used in turn
+
+TiledMatch = collections.namedtuple('TiledMatch', 'labels counts percentages coverage exact tile_size')
+TiledMatch.__doc__ = """Area statistics from ``TiledMatcher``; ``counts``/``percentages`` as in MatchResult (estimates where tiles were sampled).
+
+``labels`` is None (no full label image is produced). ``coverage`` is a
+rows x cols x N float array with the matched fraction of each tile per target,
+``exact`` a rows x cols bool array of the tiles that were matched pixel by
+pixel, and ``tile_size`` the tile edge in pixels (edge tiles may be smaller)."""
+
+
+class TiledMatcher:
+    """Tiled match statistics over a ColorMatcher's targets.
+
+    Frames of at most ``exact_budget`` pixels are matched exactly, tile by tile.
+    ``tile_size`` must be a multiple of ``stride``; ``seed`` fixes the sample jitter.
+    """
+
+    def __init__(self, matcher, tile_size=DEFAULT_TILE_SIZE, stride=DEFAULT_SAMPLE_STRIDE, exact_budget=DEFAULT_EXACT_BUDGET, seed=0):
+        if tile_size % stride: raise ValueError(f"tile_size ({tile_size}) must be a multiple of stride ({stride})")
+        self.matcher = matcher
+        self.tile_size, self.stride, self.exact_budget = tile_size, stride, exact_budget
+        self.rng = np.random.default_rng(seed)
+        self.grids, self.grids_shape, self.frames = [], None, 0
+        self.next_tile = 0  # round-robin position for budget left after the uncertain tiles
+        self.refined_tiles = self.sampled_tiles = 0
+
+    def _jitter_grids(self, height, width):
+        """``JITTER_GRIDS`` arrays of flat pixel indices, one random pixel per stride x stride cell (clipped edge cells included)."""
+        if self.grids_shape != (height, width):
+            stride = self.stride
+            cell_rows, cell_cols = -(-height // stride), -(-width // stride)
+            cell_heights = np.minimum(stride, height - np.arange(cell_rows) * stride)[:, None]
+            cell_widths = np.minimum(stride, width - np.arange(cell_cols) * stride)[None, :]
+            self.grids = []
+            for _ in range(JITTER_GRIDS):
+                ys = np.arange(cell_rows)[:, None] * stride + self.rng.integers(0, cell_heights, (cell_rows, cell_cols))
+                xs = np.arange(cell_cols)[None, :] * stride + self.rng.integers(0, cell_widths, (cell_rows, cell_cols))
+                self.grids.append((ys * width + xs).astype(np.intp))
+            self.grids_shape = (height, width)
+        return self.grids
+
+    def _sample(self, np_image_bgra):
+        """The pixels of the next jittered grid, as a cell_rows x cell_cols x 4 BGRA array."""
+        height, width = np_image_bgra.shape[:2]
+        grid = self._jitter_grids(height, width)[self.frames % JITTER_GRIDS]
+        self.frames += 1
+        if np_image_bgra.flags.c_contiguous:
+            # A gather of whole 4-byte pixels; viewing the result back as bytes keeps BGRA order on any host.
+            return np.take(np_image_bgra.view(np.uint32).reshape(-1), grid).view(np.uint8).reshape(grid.shape + (4,))
+        ys, xs = np.divmod(grid, width)
+        return np_image_bgra[ys, xs]
+
+    def _sample_counts(self, np_image_bgra, n, rows, cols):
+        """Per-tile (sampled pixel count, per-target matched sample counts), each rows x cols (x N)."""
+        sample = self._sample(np_image_bgra)
+        bits = np.unpackbits(self.matcher.labels_bgra(sample)[..., None], axis=-1, count=n, bitorder='little')
+        per_tile = self.tile_size // self.stride
+        # Every cell holds a sample, so every tile (edge tiles included) has at least one.
+        row_starts, col_starts = np.arange(0, sample.shape[0], per_tile), np.arange(0, sample.shape[1], per_tile)
+        hits = np.add.reduceat(np.add.reduceat(bits, row_starts, axis=0, dtype=np.int32), col_starts, axis=1, dtype=np.int32)
+        samples = np.outer(np.diff(np.append(row_starts, sample.shape[0])), np.diff(np.append(col_starts, sample.shape[1])))
+        return samples, hits
+
+    def match_bgra(self, np_image_bgra):
+        """TiledMatch for an HxWx4 BGRA frame."""
+        height, width = np_image_bgra.shape[:2]
+        n, size = len(self.matcher.targets), self.tile_size
+        rows, cols = -(-height // size), -(-width // size)
+        tile_heights = np.minimum(size, height - np.arange(rows) * size)
+        tile_widths = np.minimum(size, width - np.arange(cols) * size)
+        tile_pixels = np.outer(tile_heights, tile_widths)
+        coverage = np.zeros((rows, cols, n))
+        exact = np.zeros((rows, cols), dtype=bool)
+
+        if height * width <= self.exact_budget: order, first_round_robin = range(rows * cols), rows * cols
+        else:
+            samples, hits = self._sample_counts(np_image_bgra, n, rows, cols)
+            fraction = hits / samples[..., None]
+            coverage[:] = fraction
+            uncertainty = tile_pixels * (fraction * (1 - fraction)).max(axis=2, initial=0)
+            order = [int(i) for i in np.argsort(-uncertainty, axis=None, kind='stable') if uncertainty.flat[i] > 0]
+            # Then the tiles the sample calls pure, round-robin from where the last frame stopped.
+            uncertain, start, first_round_robin = set(order), self.next_tile % (rows * cols), len(order)
+            order += [i for i in itertools.chain(range(start, rows * cols), range(start)) if i not in uncertain]
+
+        budget = self.exact_budget
+        for position, index in enumerate(order):
+            r, c = divmod(int(index), cols)
+            if tile_pixels[r, c] > budget:
+                # Round-robin resumes at the first tile it could not afford.
+                if position >= first_round_robin: self.next_tile = index; break
+                continue
+            budget -= tile_pixels[r, c]
+            if position >= first_round_robin: self.next_tile = index + 1
+            tile = np_image_bgra[r * size:r * size + tile_heights[r], c * size:c * size + tile_widths[c]]
+            coverage[r, c] = self.matcher.counts(self.matcher.labels_bgra(tile)) / tile_pixels[r, c]
+            exact[r, c] = True
+
+        self.refined_tiles += int(exact.sum()); self.sampled_tiles += int(exact.size - exact.sum())
+        counts = np.rint((coverage * tile_pixels[..., None]).sum(axis=(0, 1))).astype(np.int64)
+        percentages = counts * (100.0 / (height * width)) if height * width > 0 else np.zeros(n)
+        return TiledMatch(None, counts, percentages, coverage, exact, size)
@@ -0,0 +1,30 @@
+"""Cached focus/geometry of the app window for the worker's "cursor over our own window" check.
+
+The GUI thread refreshes the state from its window events (and a slow
+timer); the worker reads ``WindowTracker.state``, an immutable tuple swapped
+in one assignment, so the per-tick check is a rectangle test with no OS call
+and no lock.
+"""
+import collections
+
+WindowState = collections.namedtuple('WindowState', 'focused left top width height')
+WindowState.__doc__ = """Focus flag and outer rectangle (screen pixels, decorations included) of a window."""
+
+UNKNOWN_WINDOW = WindowState(False, 0, 0, 0, 0)
+
+
+class WindowTracker:
+    """Latest ``WindowState`` of one window, written by the GUI thread and read by any thread."""
+
+    def __init__(self):
+        self.state = UNKNOWN_WINDOW
+        self.updates = 0
+
+    def update(self, focused, left, top, width, height):
+        state = WindowState(bool(focused), int(left), int(top), int(width), int(height))
+        if state != self.state: self.state = state; self.updates += 1
+
+    def is_over_focused(self, x, y):
+        """True if the window has focus and (x, y) lies inside it."""
+        state = self.state
+        return state.focused and state.left <= x < state.left + state.width and state.top <= y < state.top + state.height
@@ -0,0 +1,277 @@
+"""The detection worker loop, independent of where it runs.
+
+``DetectionWorker.run`` is the loop the app used to run inline: it reads the
+latest ``WorkerConfig``, ticks the engine, clicks, and publishes typed
+messages for the UI. ``EngineThread`` runs it on a thread of the calling
+process; ``process.EngineProcess`` runs the same loop in a child process.
+Both expose ``configure``, ``update_window``, ``set_export`` and ``stop``, so
+the GUI does not care which one it has (see ``start_engine``).
+"""
+import collections
+import os
+import threading
+import time
+import traceback
+
+from .capture import create_capture
+from .dominant import DominantColorAnalyzer
+from .engine import DEFAULT_CLICK_COOLDOWN, ClickPolicy, DetectionEngine
+from .perf import TICK_STAGE, PerfExporter, PerfMonitor
+from .pipeline import LatestSlot, SlotStage
+from .recorder import SessionRecorder
+from .scheduler import TickScheduler
+from .tiles import TiledMatch
+from .window import WindowTracker
+
+DEFAULT_PREVIEW_INTERVAL = 0.05
+DEFAULT_STATS_INTERVAL = 0.5
+DEFAULT_RECORDINGS_DIR = "recordings"
+# How long shutdown waits for a session recording's last chunks to be written before giving up on it.
+RECORDING_STOP_TIMEOUT = 60.0
+ENGINE_MODES = ("thread", "process")
+
+WorkerConfig = collections.namedtuple('WorkerConfig', 'version is_paused is_picker_active clicking_enabled area_tolerance capture_box_size click_method click_button '
+                                      'color1_rgb color2_rgb detected_colors_tab_active area_stats_needed target_tick_rate recording_enabled color_analysis_mode preview_visible')
+WorkerConfig.__doc__ = """Immutable settings snapshot read by the worker; ``version`` increases with every change.
+
+``preview_visible`` says whether any preview panel is on screen; preview and
+overlay frames are only produced while it is set."""
+
+
+def os_cursor():
+    import pyautogui
+    return pyautogui.position()
+
+
+def os_click(button):
+    import pydirectinput
+    pydirectinput.mouseDown(button=button); pydirectinput.mouseUp(button=button)
+
+
+def os_screen_size():
+    import pyautogui
+    return tuple(pyautogui.size())
+
+
+def area_results(result):
+    """The "area_update" payload for a tick: per-color percentage and count, or -1/-2 codes for an invalid target/error."""
+    if result.status == "ok":
+        counts, percentages = result.match.counts, result.match.percentages
+        # Large boxes are matched coarse-to-fine; the figures are estimates unless every tile was matched exactly.
+        estimated = isinstance(result.match, TiledMatch) and not result.match.exact.all()
+        return {"c1_pct": float(percentages[0]), "c1_cnt": int(counts[0]), "c2_pct": float(percentages[1]), "c2_cnt": int(counts[1]), "estimated": estimated}
+    if result.status == "invalid_target": return {"c1_pct": -1.0, "c1_cnt": -1, "c2_pct": -1.0, "c2_cnt": -1}
+    if result.status == "error": return {"c1_pct": -2.0, "c1_cnt": -2, "c2_pct": -2.0, "c2_cnt": -2}
+    return {"c1_pct": 0.0, "c1_cnt": 0, "c2_pct": 0.0, "c2_cnt": 0}
+
+
+class DetectionWorker:
+    """Runs the tick loop of one DetectionEngine until ``stop_event`` is set.
+
+    The owner replaces ``config`` (a WorkerConfig) whole; engine targets, tick
+    rate and analysis mode are re-derived only when its version changes. The
+    owner's window rectangle arrives through ``window_tracker``. Messages
+    leave through ``publish``: "center_pixel" and "area_update" every tick,
+    "preview" frames at most every ``preview_interval`` seconds and only
+    while ``config.preview_visible``,
+    "dominant_colors" from the analysis thread, "worker_stats" every
+    ``stats_interval`` seconds, "recording_failed" and "error".
+    """
+
+    def __init__(self, engine, publish, stop_event=None, cursor=os_cursor, click=os_click, preview_interval=DEFAULT_PREVIEW_INTERVAL,
+                 stats_interval=DEFAULT_STATS_INTERVAL, recordings_dir=DEFAULT_RECORDINGS_DIR, analysis_enabled=True):
+        self.engine, self.publish = engine, publish
+        self.stop_event = stop_event if stop_event is not None else threading.Event()
+        self.cursor, self.click = cursor, click
+        self.preview_interval, self.stats_interval, self.recordings_dir = preview_interval, stats_interval, recordings_dir
+        self.config = None
+        self.window_tracker = WindowTracker()
+        self.analysis_slot = LatestSlot()
+        self.analysis_stage = SlotStage("dominant-colors", self._analyze, self.analysis_slot, publish, self.stop_event) if analysis_enabled else None
+        self.perf_exporter = None
+        self.export_error = None
+        self.recorder = None
+        self.recorder_stops = []  # threads finishing recordings that were switched off
+
+    def set_export(self, path, fmt=None):
+        """Starts streaming stage timings to ``path``; None stops. Failures are reported in "worker_stats"."""
+        if path and self.perf_exporter is None:
+            try: self.perf_exporter = PerfExporter(self.engine.perf, path, fmt).start(); self.export_error = None; print(f"Exporting stage timings to {path}")
+            except Exception as e: print(f"Perf Export Error (start): {e}"); self.export_error = f"{path}: {e}"
+        elif not path and self.perf_exporter is not None:
+            exporter, self.perf_exporter = self.perf_exporter, None
+            threading.Thread(target=exporter.stop, daemon=True).start(); print("Stage timing export stopped.")
+
+    def recording_pending(self):
+        """True while a session recording is active or still being written."""
+        return self.recorder is not None or any(stopper.is_alive() for stopper in self.recorder_stops)
+
+    def stats(self):
+        perf, exporter = self.engine.perf, self.perf_exporter
+        export = {"path": exporter.path, "exported": exporter.exported, "lost": exporter.lost} if exporter else None
+        return {"type": "worker_stats", "rate": perf.rate(), "perf": perf.stats(), "cache_hit_ratio": self.engine.cache.hit_ratio,
+                "analysis_pending": self.analysis_slot.pending(), "analysis_dropped": self.analysis_slot.dropped,
+                "export": export, "export_error": self.export_error}
+
+    def _analyze(self, frame):
+        try: colors = self.engine.analyze(frame)
+        except Exception as e: print(f"Error (Dominant Colors): {e}"); traceback.print_exc(); colors = []
+        return {"type": "dominant_colors", "colors": colors}
+
+    def _start_recorder(self, cfg):
+        path = os.path.join(self.recordings_dir, time.strftime("session_%Y%m%d_%H%M%S"))
+        metadata = {"colors": (cfg.color1_rgb, cfg.color2_rgb), "tolerance": cfg.area_tolerance, "click_method": cfg.click_method}
+        try:
+            recorder = SessionRecorder(path, self.engine.capture.screen_size, metadata).start()
+            print(f"Recording session to {path}"); return recorder
+        except Exception as e:
+            print(f"Recorder Error (start): {e}"); traceback.print_exc()
+            self.publish({"type": "recording_failed", "message": f"Could not start recording: {e}"})
+            return None
+
+    def run(self):
+        engine, perf = self.engine, self.engine.perf
+        capture = engine.capture
+        if self.analysis_stage: self.analysis_stage.start()
+        try:
+            capture.open(); print(f"Worker capture opened ({type(capture).__name__}).")
+            if capture.screen_size[0] <= 0 or capture.screen_size[1] <= 0:
+                print("Error: Invalid screen dimensions detected, using pyautogui fallback"); capture.screen_size = os_screen_size()
+
+            next_ui_frame_time = next_stats_time = 0.0
+            scheduler, last_activity_key = TickScheduler(1), None
+            last_analysis_fp, applied_version, colors_tab_was_open, recording_failed = None, None, False, False
+            while not self.stop_event.is_set():
+                cfg = self.config
+                if cfg is None: self.stop_event.wait(0.05); continue
+                if cfg.version != applied_version:
+                    # Everything derived from the settings (targets, click bits, lookup table request) is rebuilt once per version.
+                    scheduler.set_target_rate(cfg.target_tick_rate)
+                    engine.configure((cfg.color1_rgb, cfg.color2_rgb), cfg.area_tolerance, cfg.click_method)
+                    engine.analyzer.set_mode(cfg.color_analysis_mode)
+                    applied_version = cfg.version
+                do_click, box_size, area_needed, colors_tab_open = cfg.clicking_enabled, cfg.capture_box_size, cfg.area_stats_needed, cfg.detected_colors_tab_active
+                if colors_tab_open and not colors_tab_was_open: engine.analyzer.reset()
+                if not colors_tab_open: last_analysis_fp = None
+                colors_tab_was_open = colors_tab_open
+
+                if time.perf_counter() >= next_stats_time:
+                    self.publish(self.stats()); next_stats_time = time.perf_counter() + self.stats_interval
+
+                if not cfg.recording_enabled: recording_failed = False
+                if cfg.recording_enabled and self.recorder is None and not recording_failed:
+                    self.recorder = self._start_recorder(cfg); recording_failed = self.recorder is None
+                elif not cfg.recording_enabled and self.recorder is not None:
+                    stopper = threading.Thread(target=self.recorder.stop, name="recorder-stop", daemon=True)
+                    stopper.start(); print("Session recording stopped."); self.recorder = None
+                    self.recorder_stops = [s for s in self.recorder_stops if s.is_alive()] + [stopper]
+
+                if cfg.is_paused or cfg.is_picker_active:
+                    scheduler.reset(); self.stop_event.wait(0.1); continue
+
+                tick_start = t = time.perf_counter()
+
+                try:
+                    if not capture.advance(): print("Capture source exhausted."); break
+                    cursor = capture.cursor()
+                    mouse_x, mouse_y = cursor if cursor is not None else self.cursor()
+                    t = perf.mark("cursor", t)
+                    check_center = False
+
+                    if do_click and not colors_tab_open:
+                        check_center = not self.window_tracker.is_over_focused(mouse_x, mouse_y)
+                        t = perf.mark("focus", t)
+
+                    result = engine.tick(mouse_x, mouse_y, box_size, need_area=area_needed, check_center=check_center)
+                    t = time.perf_counter()
+
+                    if result.click:
+                        try: self.click(cfg.click_button)
+                        except Exception as click_err: print(f"ERROR click: {click_err}")
+                        t = perf.mark("click", t)
+
+                    self.publish({"type": "center_pixel", "rgb": result.center_rgb})
+                    if area_needed: self.publish({"type": "area_update", "results": area_results(result)})
+                    if self.recorder: self.recorder.record(time.time(), (mouse_x, mouse_y), box_size, result._replace(frame=engine.detach(result.frame)))
+                    perf.mark("enqueue", t)
+
+                    if area_needed:
+                        if cfg.preview_visible and time.perf_counter() >= next_ui_frame_time:
+                            # The tick itself only matches and decides; preview and overlay frames are materialized at the
+                            # UI refresh rate, and not at all while no preview panel is shown.
+                            capture_img, overlay_img = engine.preview(result)
+                            self.publish({"type": "preview", "capture_img": capture_img, "overlay_img": overlay_img})
+                            next_ui_frame_time = time.perf_counter() + self.preview_interval
+
+                        if self.analysis_stage and colors_tab_open and result.frame is not None and result.fingerprint != last_analysis_fp:
+                            self.analysis_slot.publish(engine.detach(result.frame)); last_analysis_fp = result.fingerprint
+
+                    # Back off while neither the cursor, the captured pixels nor the settings change.
+                    activity_key = (mouse_x, mouse_y, result.fingerprint if result.fingerprint is not None else result.center_rgb, cfg.version)
+                    scheduler.note_activity(activity_key != last_activity_key); last_activity_key = activity_key
+                    perf.mark(TICK_STAGE, tick_start)
+
+                except Exception as loop_err:
+                    print(f"Critical Worker Error in loop: {loop_err}"); traceback.print_exc()
+                    self.publish({"type": "error", "message": str(loop_err)}); time.sleep(0.5)
+
+                scheduler.wait(self.stop_event)
+
+        except Exception as thread_init_error:
+            print(f"Critical worker init error: {thread_init_error}"); traceback.print_exc()
+            self.publish({"type": "error", "message": f"Worker failed init: {thread_init_error}"})
+        finally:
+            if self.recorder: self.recorder.stop(); self.recorder = None; print("Session recording stopped.")
+            for stopper in self.recorder_stops: stopper.join()
+            if self.perf_exporter: self.perf_exporter.stop(); self.perf_exporter = None; print("Stage timing export stopped.")
+            capture.close(); print("Worker capture closed.")
+            print("Processing loop stopped.")
+
+
+def create_worker(publish, capture_backend="mss", capture_options=None, analyzer_options=None, click_cooldown=DEFAULT_CLICK_COOLDOWN, **worker_options):
+    """A DetectionWorker around a new engine (capture by backend name, dominant-color analyzer, click policy, perf monitor)."""
+    engine = DetectionEngine(create_capture(capture_backend, **(capture_options or {})), DominantColorAnalyzer(**(analyzer_options or {})),
+                             ClickPolicy(click_cooldown), PerfMonitor())
+    return DetectionWorker(engine, publish, **worker_options)
+
+
+class EngineThread:
+    """A DetectionWorker on a daemon thread of this process."""
+
+    def __init__(self, publish, **options):
+        self.worker = create_worker(publish, **options)
+        self.thread = None
+
+    def start(self, config=None):
+        if config is not None: self.worker.config = config
+        self.thread = threading.Thread(target=self.worker.run, name="detection-worker", daemon=True)
+        self.thread.start(); print("Worker thread started.")
+        return self
+
+    def configure(self, config):
+        self.worker.config = config
+
+    def update_window(self, state):
+        self.worker.window_tracker.update(*state)
+
+    def set_export(self, path, fmt=None):
+        self.worker.set_export(path, fmt)
+
+    def stop(self, timeout=0.5):
+        self.worker.stop_event.set()
+        if self.thread and self.thread.is_alive():
+            print("Waiting for worker thread..."); self.thread.join(timeout)
+            if self.thread.is_alive() and self.worker.recording_pending():
+                # The recorder's writer is a daemon thread; exiting now would cut the recording's last chunks.
+                print("Waiting for the session recording to be written..."); self.thread.join(RECORDING_STOP_TIMEOUT)
+            if self.thread.is_alive(): print("Worker thread join timed out.")
+        if self.worker.analysis_stage: self.worker.analysis_stage.join(timeout)
+
+
+def start_engine(mode, publish, config=None, **options):
+    """Starts the detection loop as an ``EngineThread`` ("thread") or ``process.EngineProcess`` ("process")."""
+    if mode == "thread": return EngineThread(publish, **options).start(config)
+    if mode == "process":
+        from .process import EngineProcess
+        return EngineProcess(publish, **options).start(config)
+    raise ValueError(f"Unknown engine mode: {mode}")
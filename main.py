@@ -1,20 +1,20 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-from PIL import Image, ImageTk
-import cv2
-import numpy as np
 import os
 import json
 import keyboard
 import pyautogui
-import mss
 import traceback
 import time
-import pygetwindow as gw
-import pydirectinput
 import threading
-import queue
-import collections
+from colorbot import CaptureError, LatestSlots, MssCapture, WindowTracker, rgb_to_lab
+from colorbot.perf import HISTOGRAM_EDGES_MS, TICK_STAGE
+from colorbot.dominant import MODES as COLOR_ANALYSIS_MODES
+from colorbot.matcher import METRICS as CLICK_METHODS
+from colorbot.colortable import ColorRows
+from colorbot.picker import DEFAULT_LOUPE_SIZE, LOUPE_ZOOMS, CanvasTiles, ScreenTiles
+from colorbot.preview import PhotoPreview, PreviewResizer
+from colorbot.worker import WorkerConfig, start_engine
 
 CONFIG_FILE = "color_checker_config.json"
 DEFAULT_AREA_TOLERANCE = 15
@@ -24,34 +24,54 @@ DEFAULT_CLICK_BUTTON = "left"
 DEFAULT_CLICKING_ENABLED = True
 DEFAULT_PAUSE_HOTKEY = 'ctrl+shift+x'
 DEFAULT_TOGGLE_CLICK_HOTKEY = 'ctrl+shift+c'
-WORKER_SLEEP_TIME = 0.001
+DEFAULT_TARGET_TICK_RATE = 1000
 CLICK_COOLDOWN = 0.05
 UI_UPDATE_INTERVAL = 50
 COLOR_ANALYSIS_ENABLED = True
 COLOR_ANALYSIS_RESIZE_WIDTH = 64
 COLOR_ANALYSIS_K = 10
 COLOR_ANALYSIS_MIN_PERCENT = 2.0
+DEFAULT_COLOR_ANALYSIS_MODE = "streaming"
 MOUSE_PIXEL_POLL_INTERVAL = 75
+PICKER_LOUPE_ZOOM = 8
+WINDOW_REFRESH_INTERVAL = 1000
+CAPTURE_BACKEND = "mss"
+CAPTURE_OPTIONS = {}
+ENGINE_MODE = "thread"  # "process" runs capture, matching and clicks in a child process, away from the GUI's GIL
+RECORDINGS_DIR = "recordings"
+PERF_UPDATE_INTERVAL = 500
+PERF_EXPORT_DIR = "perf"
+PERF_EXPORT_FORMAT = "csv"
+PERF_STAGES = (TICK_STAGE, "cursor", "focus", "area_grab", "match", "center_grab", "click", "enqueue", "convert", "overlay", "dominant")
+PERF_HISTOGRAM_BARS = " ▁▂▃▄▅▆▇█"
 
 class ColorBotApp:
     def __init__(self, root):
         self.root = root
-        self.sct_main = mss.mss()
-        self.worker_thread = None
+        self.ui_capture = MssCapture().open()
+        self.engine_handle = None
         self.stop_event = threading.Event()
-        self.update_queue = queue.Queue()
-        self.config_lock = threading.Lock()
+        self.ui_slots = LatestSlots()
+        self.worker_stats = {}
+        self.preview_resizer = PreviewResizer()
+        self.latest_preview = None
+        self.perf_export_path = None
+        self.config_lock = threading.RLock()
+        self.window_tracker = WindowTracker()
+        self.window_updates_sent = 0
+        self.window_refresh_pending = False
         self.active_hotkeys = {}
         self.key_listener_hook = None
 
-        self.color1_rgb = (204, 204, 204); self.color1_lab = None
-        self.color2_rgb = (38, 120, 122); self.color2_lab = None
+        self.color1_rgb = (204, 204, 204)
+        self.color2_rgb = (38, 120, 122)
         self.area_tolerance = DEFAULT_AREA_TOLERANCE
         self.capture_box_size = DEFAULT_CAPTURE_BOX_SIZE
         self.click_method = DEFAULT_CLICK_METHOD
         self.click_button = DEFAULT_CLICK_BUTTON
+        self.target_tick_rate = DEFAULT_TARGET_TICK_RATE
+        self.color_analysis_mode = DEFAULT_COLOR_ANALYSIS_MODE
         self.is_paused = True
-        self.last_click_time = 0
         self.is_picker_active = False
         self.clicking_enabled = DEFAULT_CLICKING_ENABLED
         self.pause_hotkey_str = DEFAULT_PAUSE_HOTKEY
@@ -60,13 +80,22 @@ class ColorBotApp:
         self.hotkey_target_widget = None; self.hotkey_target_attr = None
         self.detected_colors_tab_active = False
         self.mouse_pixel_polling_active = False
+        self.area_stats_needed = True
+        self.recording_enabled = False
+        self.preview_visible = True
+        self.worker_config = self._build_worker_config(0)
 
         self._init_ui()
         self._load_config()
         self._start_worker()
         self.root.protocol("WM_DELETE_WINDOW", self._on_closing)
+        self.root.bind("<Map>", lambda e: self._on_root_visibility(e, True))
+        self.root.bind("<Unmap>", lambda e: self._on_root_visibility(e, False))
+        for sequence in ("<Configure>", "<FocusIn>", "<FocusOut>"): self.root.bind(sequence, self._schedule_window_refresh, add="+")
         self.root.after(UI_UPDATE_INTERVAL, self._check_queue)
         self.root.after(MOUSE_PIXEL_POLL_INTERVAL, self._update_mouse_pixel_info)
+        self.root.after(PERF_UPDATE_INTERVAL, self._update_perf_tab)
+        self.root.after(WINDOW_REFRESH_INTERVAL, self._poll_window_state)
 
     def _init_ui(self):
         self.root.title("Color Detection & Clicker v3.1")
@@ -103,6 +132,10 @@ class ColorBotApp:
         self.status_value_label.pack(side=tk.LEFT, padx=5)
         self.toggle_button = ttk.Button(top_frame, text="Pause/Resume", command=self._toggle_script)
         self.toggle_button.pack(side=tk.RIGHT, padx=5)
+        self.recording_enabled_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(top_frame, text="Record Session", variable=self.recording_enabled_var, command=self._toggle_recording).pack(side=tk.RIGHT, padx=5)
+        self.pipeline_stats_var = tk.StringVar(value="")
+        ttk.Label(top_frame, textvariable=self.pipeline_stats_var, style="Small.TLabel").pack(side=tk.RIGHT, padx=10)
 
         self.notebook = ttk.Notebook(self.root)
         self.notebook.pack(pady=10, padx=10, fill=tk.BOTH, expand=True)
@@ -167,6 +200,8 @@ class ColorBotApp:
         self.click_method_var = tk.StringVar(value=self.click_method)
         ttk.Radiobutton(click_method_frame, text="RGB", variable=self.click_method_var, value="RGB", command=self._update_click_settings).pack(side=tk.LEFT, padx=5)
         ttk.Radiobutton(click_method_frame, text="LAB (ΔE)", variable=self.click_method_var, value="LAB", command=self._update_click_settings).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(click_method_frame, text="ΔE94", variable=self.click_method_var, value="DE94", command=self._update_click_settings).pack(side=tk.LEFT, padx=5)
+        ttk.Radiobutton(click_method_frame, text="ΔE2000", variable=self.click_method_var, value="DE2000", command=self._update_click_settings).pack(side=tk.LEFT, padx=5)
 
         click_button_frame = ttk.Frame(controls_frame); click_button_frame.grid(row=12, column=0, columnspan=4, pady=5, sticky='w')
         ttk.Label(click_button_frame, text="Click Button:", anchor='w').pack(side=tk.LEFT, padx=5)
@@ -234,8 +269,17 @@ class ColorBotApp:
         self.colors_capture_preview_label = tk.Label(colors_preview_frame, bg="black", width=self.colors_preview_size[0], height=self.colors_preview_size[1], relief="sunken")
         self.colors_capture_preview_label.pack(pady=(2, 0))
 
+        # Notebook tab index -> its (capture, overlay) previews; only the selected tab's are drawn.
+        self.preview_panels = {
+            0: (PhotoPreview(self.settings_capture_preview_label, self.preview_size, self.preview_resizer), PhotoPreview(self.settings_overlay_preview_label, self.preview_size, self.preview_resizer)),
+            1: (PhotoPreview(self.colors_capture_preview_label, self.colors_preview_size, self.preview_resizer), PhotoPreview(self.colors_overlay_preview_label, self.colors_preview_size, self.preview_resizer))}
+
         colors_bottom_frame = ttk.Frame(colors_tab); colors_bottom_frame.pack(side=tk.BOTTOM, fill=tk.BOTH, expand=True)
-        ttk.Label(colors_bottom_frame, text=f"Dominant Colors in Capture Area (Top {COLOR_ANALYSIS_K}, >{COLOR_ANALYSIS_MIN_PERCENT:.1f}%):", anchor='w').pack(pady=(0, 5), fill=tk.X)
+        colors_header_frame = ttk.Frame(colors_bottom_frame); colors_header_frame.pack(pady=(0, 5), fill=tk.X)
+        ttk.Label(colors_header_frame, text=f"Dominant Colors in Capture Area (Top {COLOR_ANALYSIS_K}, >{COLOR_ANALYSIS_MIN_PERCENT:.1f}%):", anchor='w').pack(side=tk.LEFT)
+        self.color_analysis_mode_var = tk.StringVar(value=self.color_analysis_mode)
+        for text, value in (("Histogram", "histogram"), ("K-means (full)", "full"), ("K-means (stream)", "streaming")):
+            ttk.Radiobutton(colors_header_frame, text=text, variable=self.color_analysis_mode_var, value=value, command=self._update_color_analysis_mode).pack(side=tk.RIGHT, padx=5)
 
         cols = ('swatch', 'rgb', 'lab', 'percent')
         self.color_tree = ttk.Treeview(colors_bottom_frame, columns=cols, show='headings', height=8)
@@ -248,6 +292,28 @@ class ColorBotApp:
         self.color_tree.configure(yscrollcommand=tree_scrollbar.set)
         tree_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         self.color_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.color_rows = ColorRows(self.color_tree, COLOR_ANALYSIS_K)
+
+        perf_tab = ttk.Frame(self.notebook, padding=10)
+        self.notebook.add(perf_tab, text=' Performance ')
+
+        perf_summary_frame = ttk.Frame(perf_tab); perf_summary_frame.pack(side=tk.TOP, fill=tk.X, pady=(0, 10))
+        self.perf_rate_var = tk.StringVar(value="Achieved: --- ticks/s")
+        ttk.Label(perf_summary_frame, textvariable=self.perf_rate_var, style="Header.TLabel").grid(row=0, column=0, padx=5, pady=2, sticky='w')
+        self.perf_queue_var = tk.StringVar(value="Queue depth: ---")
+        ttk.Label(perf_summary_frame, textvariable=self.perf_queue_var, style="Small.TLabel").grid(row=1, column=0, padx=5, pady=2, sticky='w')
+        self.perf_export_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(perf_summary_frame, text=f"Export timings ({PERF_EXPORT_FORMAT.upper()})", variable=self.perf_export_var, command=self._toggle_perf_export).grid(row=0, column=1, padx=20, pady=2, sticky='w')
+        self.perf_export_status_var = tk.StringVar(value="")
+        ttk.Label(perf_summary_frame, textvariable=self.perf_export_status_var, style="Small.TLabel").grid(row=1, column=1, padx=20, pady=2, sticky='w')
+
+        perf_cols = ('stage', 'samples', 'mean', 'p50', 'p99', 'max', 'histogram')
+        self.perf_tree = ttk.Treeview(perf_tab, columns=perf_cols, show='headings', height=len(PERF_STAGES))
+        for col, text, width, anchor in (('stage', 'Stage', 110, tk.W), ('samples', 'Samples', 70, tk.E), ('mean', 'Mean ms', 80, tk.E), ('p50', 'p50 ms', 80, tk.E),
+                                         ('p99', 'p99 ms', 80, tk.E), ('max', 'Max ms', 80, tk.E), ('histogram', f"Histogram ({HISTOGRAM_EDGES_MS[0] * 1000:g}µs … {HISTOGRAM_EDGES_MS[-1]:g}ms+)", 200, tk.W)):
+            self.perf_tree.heading(col, text=text); self.perf_tree.column(col, width=width, anchor=anchor)
+        for stage in PERF_STAGES: self.perf_tree.insert('', tk.END, iid=stage, values=(stage, 0, '', '', '', '', ''))
+        self.perf_tree.pack(side=tk.TOP, fill=tk.BOTH, expand=True)
 
         self.color1_rgb_entry.bind("<Return>", lambda e: self._set_color_variable(self.color1_label, self.color1_rgb_entry, "color1"))
         self.color1_rgb_entry.bind("<FocusOut>", lambda e: self._set_color_variable(self.color1_label, self.color1_rgb_entry, "color1"))
@@ -259,37 +325,40 @@ class ColorBotApp:
 
     def _rgb_to_lab(self, rgb_tuple):
         if not isinstance(rgb_tuple, (tuple, list)) or len(rgb_tuple) != 3: return (0, 0, 0)
-        try:
-            rgb_clamped = tuple(max(0, min(255, int(c))) for c in rgb_tuple)
-            rgb_np = np.uint8([[rgb_clamped]])
-            lab_np = cv2.cvtColor(rgb_np, cv2.COLOR_RGB2LAB)
-            return tuple(map(int, lab_np[0][0]))
+        try: return rgb_to_lab(rgb_tuple)
         except Exception: return (0, 0, 0)
 
-    def _lab_to_rgb(self, lab_tuple):
-        if not isinstance(lab_tuple, (tuple, list)) or len(lab_tuple) != 3: return (0, 0, 0)
-        try:
-            lab_np = np.uint8([[lab_tuple]])
-            rgb_np = cv2.cvtColor(lab_np, cv2.COLOR_LAB2RGB)
-            return tuple(map(int, rgb_np[0][0]))
-        except Exception: return (0, 0, 0)
+    def _build_worker_config(self, version):
+        return WorkerConfig(version, *(getattr(self, field) for field in WorkerConfig._fields[1:]))
 
-    def _update_area_tolerance(self, val_str):
+    def _set_config(self, **changes):
+        """Applies setting changes and, if any differ, publishes them to the worker as a new WorkerConfig.
+
+        Writers serialize on ``config_lock``; the worker never takes it and reads
+        ``worker_config`` (an immutable snapshot replaced in one assignment) once per tick.
+        The snapshot is handed to the engine handle, which pickles it across when the engine runs in a process.
+        """
         with self.config_lock:
-            try: self.area_tolerance = max(0, min(100, int(float(val_str))))
-            except (ValueError, tk.TclError): pass
+            if all(getattr(self, name) == value for name, value in changes.items()): return
+            for name, value in changes.items(): setattr(self, name, value)
+            self.worker_config = self._build_worker_config(self.worker_config.version + 1)
+            if self.engine_handle: self.engine_handle.configure(self.worker_config)
+
+    def _update_area_tolerance(self, val_str):
+        try: self._set_config(area_tolerance=max(0, min(100, int(float(val_str)))))
+        except (ValueError, tk.TclError): pass
         if hasattr(self, 'area_tolerance_value_label'): self.area_tolerance_value_label.config(text=str(self.area_tolerance))
 
     def _update_box_size(self, val_str):
-        with self.config_lock:
-            try: self.capture_box_size = max(10, min(600, int(float(val_str))))
-            except (ValueError, tk.TclError): pass
+        try: self._set_config(capture_box_size=max(10, min(600, int(float(val_str)))))
+        except (ValueError, tk.TclError): pass
         if hasattr(self, 'box_size_value_label'): self.box_size_value_label.config(text=str(self.capture_box_size))
 
     def _update_click_settings(self):
-        with self.config_lock:
-            self.click_method = self.click_method_var.get()
-            self.click_button = self.click_button_var.get()
+        self._set_config(click_method=self.click_method_var.get(), click_button=self.click_button_var.get())
+
+    def _update_color_analysis_mode(self):
+        self._set_config(color_analysis_mode=self.color_analysis_mode_var.get())
 
     def _update_color_label_bg(self, label, rgb_tuple):
         try:
@@ -308,41 +377,37 @@ class ColorBotApp:
 
     def _set_color_variable(self, label_widget, entry_widget, color_var_name):
         rgb_tuple = self._parse_rgb_string(entry_widget.get())
-        with self.config_lock:
-            current_color = self.color1_rgb if color_var_name == "color1" else self.color2_rgb
-            if rgb_tuple is None:
-                entry_widget.delete(0, tk.END)
-                entry_widget.insert(0, f"{current_color[0]}, {current_color[1]}, {current_color[2]}")
-                return
-            lab_value = self._rgb_to_lab(rgb_tuple)
-            if color_var_name == "color1": self.color1_rgb, self.color1_lab = rgb_tuple, lab_value
-            else: self.color2_rgb, self.color2_lab = rgb_tuple, lab_value
+        current_color = self.color1_rgb if color_var_name == "color1" else self.color2_rgb
+        if rgb_tuple is None:
+            entry_widget.delete(0, tk.END)
+            entry_widget.insert(0, f"{current_color[0]}, {current_color[1]}, {current_color[2]}")
+            return
+        if color_var_name == "color1": self._set_config(color1_rgb=rgb_tuple)
+        else: self._set_config(color2_rgb=rgb_tuple)
         self._update_color_label_bg(label_widget, rgb_tuple)
         label_widget.config(text=f"{rgb_tuple[0]},{rgb_tuple[1]},{rgb_tuple[2]}")
 
     def _pick_color_from_screen(self, label_widget, entry_widget, color_var_name):
         PAN_SPEED_FACTOR = 0.4
         if self.is_picker_active: return
-        self.is_picker_active = True
+        self._set_config(is_picker_active=True)
         print("Opening color picker...")
-        screenshot_pil, screenshot_np_rgb, img_width, img_height = None, None, 0, 0
+        tiles, img_width, img_height = None, 0, 0
 
         try:
-            monitor_info = self.sct_main.monitors[0]
-            print(f"Picker capturing monitor area: {monitor_info}")
-            if not monitor_info or monitor_info["width"] <= 0 or monitor_info["height"] <= 0:
-                raise Exception(f"Invalid monitor info for full desktop: {monitor_info}")
+            desktop_bounds = self.ui_capture.virtual_bounds
+            print(f"Picker capturing desktop area: {desktop_bounds}")
+            if not desktop_bounds or desktop_bounds[2] <= 0 or desktop_bounds[3] <= 0:
+                raise Exception(f"Invalid monitor info for full desktop: {desktop_bounds}")
 
-            sct_img = self.sct_main.grab(monitor_info)
-            screenshot_np_bgra = np.array(sct_img)
-            screenshot_np_rgb = cv2.cvtColor(screenshot_np_bgra, cv2.COLOR_BGRA2RGB)
-            screenshot_pil = Image.frombytes("RGB", sct_img.size, sct_img.rgb)
-            img_width, img_height = screenshot_pil.size
+            # The grab is the only full-size buffer; tiles in view and the loupe are converted from it on demand.
+            tiles = ScreenTiles(self.ui_capture.grab(*desktop_bounds))
+            img_width, img_height = tiles.width, tiles.height
 
         except Exception as e:
             print(f"Picker Error (Grab): {e}"); traceback.print_exc()
             messagebox.showerror("Picker Error", f"Could not grab screen:\n{e}")
-            self.is_picker_active = False
+            self._set_config(is_picker_active=False)
             return
 
         picker_window = tk.Toplevel(self.root)
@@ -351,19 +416,19 @@ class ColorBotApp:
         win_w = min(img_width + 40, max_win_w)
         win_h = min(img_height + 40, max_win_h)
         picker_window.geometry(f"{win_w}x{win_h}")
-        picker_window.title("LMB: Pick | MMB/RMB Drag: Scroll | Esc: Cancel")
+        picker_window.title("LMB: Pick | MMB/RMB Drag: Scroll | Wheel: Loupe Zoom | Esc: Cancel")
         picker_window.attributes("-topmost", True)
 
         def on_esc(event=None):
             if picker_window and picker_window.winfo_exists():
                 print("Picker cancelled (ESC).")
-                self.is_picker_active = False
+                self._set_config(is_picker_active=False)
                 picker_window.destroy()
 
         def on_close():
             if picker_window and picker_window.winfo_exists():
                 print("Picker closed (WM_DELETE_WINDOW).")
-                self.is_picker_active = False
+                self._set_config(is_picker_active=False)
                 picker_window.destroy()
 
         try:
@@ -372,7 +437,7 @@ class ColorBotApp:
         except tk.TclError as bind_err:
             print(f"CRITICAL PICKER ERROR: Failed to bind events directly to Toplevel: {bind_err}")
             messagebox.showerror("Picker Critical Error", f"Failed basic picker window setup:\n{bind_err}")
-            self.is_picker_active = False
+            self._set_config(is_picker_active=False)
             if picker_window and picker_window.winfo_exists():
                 try: picker_window.destroy()
                 except tk.TclError: pass
@@ -382,15 +447,30 @@ class ColorBotApp:
         canvas = tk.Canvas(frame, bg="black", cursor="crosshair")
         v_scroll = ttk.Scrollbar(frame, orient=tk.VERTICAL, command=canvas.yview)
         h_scroll = ttk.Scrollbar(frame, orient=tk.HORIZONTAL, command=canvas.xview)
-        canvas.configure(yscrollcommand=v_scroll.set, xscrollcommand=h_scroll.set)
         canvas.grid(row=0, column=0, sticky='nsew'); v_scroll.grid(row=0, column=1, sticky='ns'); h_scroll.grid(row=1, column=0, sticky='ew')
         frame.grid_rowconfigure(0, weight=1); frame.grid_columnconfigure(0, weight=1)
 
+        loupe_frame = ttk.Frame(picker_window, relief="solid", borderwidth=1)
+        loupe_label = tk.Label(loupe_frame, bg="black", width=DEFAULT_LOUPE_SIZE, height=DEFAULT_LOUPE_SIZE); loupe_label.pack()
+        loupe_text = tk.StringVar(value="")
+        ttk.Label(loupe_frame, textvariable=loupe_text, style="Small.TLabel", anchor='center').pack(fill=tk.X)
+        loupe = PhotoPreview(loupe_label, (DEFAULT_LOUPE_SIZE, DEFAULT_LOUPE_SIZE), PreviewResizer())
+        loupe_state = {'zoom': LOUPE_ZOOMS.index(PICKER_LOUPE_ZOOM), 'x': 0, 'y': 0, 'corner': None}
+
         try:
-            img_tk = ImageTk.PhotoImage(screenshot_pil)
-            canvas.create_image(0, 0, anchor='nw', image=img_tk)
-            canvas.image = img_tk
-            canvas.configure(scrollregion=canvas.bbox('all'))
+            canvas_tiles = CanvasTiles(canvas, tiles)
+            render_pending = {'active': False}
+
+            def render_tiles():
+                render_pending['active'] = False
+                if canvas.winfo_exists(): canvas_tiles.render()
+
+            def on_view_changed(scrollbar, *args):
+                # Scrolling, panning and resizing all end up here; coalesce them into one render per idle pass.
+                scrollbar.set(*args)
+                if not render_pending['active']: render_pending['active'] = True; canvas.after_idle(render_tiles)
+
+            canvas.configure(yscrollcommand=lambda *a: on_view_changed(v_scroll, *a), xscrollcommand=lambda *a: on_view_changed(h_scroll, *a))
         except Exception as e:
             print(f"Picker Error (Display): {e}")
             messagebox.showerror("Picker Error", f"Display error:\n{e}")
@@ -404,18 +484,15 @@ class ColorBotApp:
             cx, cy = canvas.canvasx(e.x), canvas.canvasy(e.y)
             ix, iy = int(min(max(cx, 0), img_width - 1)), int(min(max(cy, 0), img_height - 1))
             try:
-                rgb_tuple = tuple(screenshot_np_rgb[iy, ix])
+                rgb_tuple = tiles.pixel_rgb(ix, iy)
                 print(f"Pixel selected: ({ix}, {iy}) -> RGB: {rgb_tuple}")
-            except IndexError:
-                print("Warning: Click processed slightly outside image bounds.")
-                return
             except Exception as err:
                 print(f"Pixel get error: {err}")
                 return
 
             saved_rgb = rgb_tuple
             print("Picker finished, scheduling color update.")
-            self.is_picker_active = False
+            self._set_config(is_picker_active=False)
 
             if picker_window.winfo_exists():
                 picker_window.destroy()
@@ -439,12 +516,36 @@ class ColorBotApp:
             if not canvas.winfo_exists(): return
             panning['active'] = False; canvas.config(cursor="crosshair")
 
+        def update_loupe():
+            if not loupe_label.winfo_exists(): return
+            x, y, zoom = loupe_state['x'], loupe_state['y'], LOUPE_ZOOMS[loupe_state['zoom']]
+            loupe.show("loupe", tiles.loupe(x, y, zoom))
+            r, g, b = tiles.pixel_rgb(x, y)
+            loupe_text.set(f"{x}, {y}  RGB {r},{g},{b}  x{zoom:g}")
+
+        def on_motion(e):
+            if not canvas.winfo_exists(): return
+            loupe_state['x'] = int(min(max(canvas.canvasx(e.x), 0), img_width - 1))
+            loupe_state['y'] = int(min(max(canvas.canvasy(e.y), 0), img_height - 1))
+            # Keep the loupe in the top corner away from the cursor.
+            corner = 'ne' if e.x < DEFAULT_LOUPE_SIZE + 40 and e.y < DEFAULT_LOUPE_SIZE + 60 else 'nw'
+            if corner != loupe_state['corner']:
+                loupe_frame.place(relx=1 if corner == 'ne' else 0, x=-24 if corner == 'ne' else 8, y=8, anchor=corner); loupe_state['corner'] = corner
+            update_loupe()
+
+        def on_wheel(e):
+            step = 1 if getattr(e, 'num', None) == 4 or getattr(e, 'delta', 0) > 0 else -1
+            loupe_state['zoom'] = min(max(loupe_state['zoom'] + step, 0), len(LOUPE_ZOOMS) - 1)
+            update_loupe()
+
         def bind_canvas_events():
             if canvas.winfo_exists():
                 canvas.bind("<Button-1>", on_lclick)
                 canvas.bind("<ButtonPress-2>", on_mpress); canvas.bind("<ButtonPress-3>", on_mpress)
                 canvas.bind("<B2-Motion>", on_mmotion); canvas.bind("<B3-Motion>", on_mmotion)
                 canvas.bind("<ButtonRelease-2>", on_mrelease); canvas.bind("<ButtonRelease-3>", on_mrelease)
+                canvas.bind("<Motion>", on_motion)
+                canvas.bind("<MouseWheel>", on_wheel); canvas.bind("<Button-4>", on_wheel); canvas.bind("<Button-5>", on_wheel)
                 print("Picker canvas events bound.")
             else:
                 print("Warning: Picker canvas destroyed before events could be bound.")
@@ -473,181 +574,24 @@ class ColorBotApp:
             traceback.print_exc()
 
 
-    def _processing_loop(self):
-        sct_worker = None
-        try:
-            sct_worker = mss.mss(); print("Worker thread MSS instance created.")
-            monitors = sct_worker.monitors
-            primary_monitor = monitors[1] if len(monitors) > 1 else monitors[0]
-            screen_width, screen_height = primary_monitor["width"], primary_monitor["height"]
-            if screen_width <= 0 or screen_height <= 0:
-                print("Error: Invalid screen dimensions detected, using pyautogui fallback"); screen_width, screen_height = pyautogui.size()
-
-            while not self.stop_event.is_set():
-                start_time = time.perf_counter()
-                with self.config_lock:
-                    paused = self.is_paused
-                    do_click = self.clicking_enabled
-                    area_tol = self.area_tolerance
-                    box_size = self.capture_box_size
-                    clk_method = self.click_method
-                    c1_lab, c2_lab = self.color1_lab, self.color2_lab
-                    c1_rgb, c2_rgb = self.color1_rgb, self.color2_rgb
-                    clk_button = self.click_button
-                    colors_tab_open = self.detected_colors_tab_active
-
-                if paused or self.is_picker_active:
-                    time.sleep(0.1); continue
-
-                try:
-                    mouse_x, mouse_y = pyautogui.position()
-                    center_rgb_detected, click_decision = None, False
-
-                    if do_click and not colors_tab_open:
-                        is_mouse_over_window, is_app_focused = False, False
-                        try:
-                            active_window = gw.getActiveWindow()
-                            if active_window and active_window.title == self.root.title():
-                                is_app_focused = True
-                                win_x, win_y, win_w, win_h = active_window.left, active_window.top, active_window.width, active_window.height
-                                if win_x <= mouse_x < win_x + win_w and win_y <= mouse_y < win_y + win_h:
-                                    is_mouse_over_window = True
-                        except Exception: pass
-
-                        can_check_center_and_click = not is_mouse_over_window
-
-                        if can_check_center_and_click:
-                            try:
-                                center_sct_img = sct_worker.grab({"left": mouse_x, "top": mouse_y, "width": 1, "height": 1})
-                                center_np_rgb = cv2.cvtColor(np.array(center_sct_img), cv2.COLOR_BGRA2RGB)
-                                if center_np_rgb.size > 0:
-                                    center_rgb_detected = tuple(center_np_rgb[0, 0])
-                                    match1, match2 = False, False
-                                    if clk_method == "LAB" and c1_lab and c2_lab:
-                                        center_lab_np = np.array(self._rgb_to_lab(center_rgb_detected), dtype=np.float32)
-                                        delta_e1 = np.sqrt(np.sum((center_lab_np - np.array(c1_lab, dtype=np.float32))**2))
-                                        delta_e2 = np.sqrt(np.sum((center_lab_np - np.array(c2_lab, dtype=np.float32))**2))
-                                        match1, match2 = delta_e1 <= area_tol, delta_e2 <= area_tol
-                                    elif clk_method == "RGB" and c1_rgb and c2_rgb:
-                                        match1 = self._colors_within_rgb_tolerance(center_rgb_detected, c1_rgb, area_tol)
-                                        match2 = self._colors_within_rgb_tolerance(center_rgb_detected, c2_rgb, area_tol)
-                                    if match1 or match2: click_decision = True
-                            except mss.ScreenShotError: pass
-                            except Exception as e: print(f"Worker Error (Center Grab): {e}"); center_rgb_detected = None
-
-                    self.update_queue.put({"type": "center_pixel", "rgb": center_rgb_detected})
-
-                    current_time = time.monotonic()
-                    if click_decision and (current_time - self.last_click_time > CLICK_COOLDOWN):
-                        try: pydirectinput.mouseDown(button=clk_button); pydirectinput.mouseUp(button=clk_button); self.last_click_time = current_time
-                        except Exception as click_err: print(f"ERROR pydirectinput click: {click_err}")
-
-                    half_size = box_size // 2
-                    left, top = max(0, mouse_x - half_size), max(0, mouse_y - half_size)
-                    capture_width = min(box_size, screen_width - left); capture_height = min(box_size, screen_height - top)
-
-                    area_results = {"c1_pct": 0.0, "c1_cnt": 0, "c2_pct": 0.0, "c2_cnt": 0}
-                    capture_img_for_ui, overlay_img_for_ui, dominant_colors_for_ui = None, None, []
-
-                    if capture_width > 0 and capture_height > 0:
-                        try:
-                            capture_dict = {"left": left, "top": top, "width": capture_width, "height": capture_height}
-                            area_sct_img = sct_worker.grab(capture_dict)
-                            area_np_rgb = cv2.cvtColor(np.array(area_sct_img), cv2.COLOR_BGRA2RGB)
-
-                            if area_np_rgb.size > 0:
-                                capture_img_for_ui = area_np_rgb.copy()
-
-                                if c1_lab is not None and c2_lab is not None:
-                                    c1_lab_np = np.array(c1_lab, dtype=np.float32)
-                                    c2_lab_np = np.array(c2_lab, dtype=np.float32)
-                                    c1_pct, c1_cnt, mask1 = self._calculate_color_stats_lab(area_np_rgb, c1_lab_np, area_tol)
-                                    c2_pct, c2_cnt, mask2 = self._calculate_color_stats_lab(area_np_rgb, c2_lab_np, area_tol)
-                                    area_results = {"c1_pct": c1_pct, "c1_cnt": c1_cnt, "c2_pct": c2_pct, "c2_cnt": c2_cnt}
-                                    if mask1 is not None and mask2 is not None:
-                                        overlay = area_np_rgb.copy(); overlay[mask1 == 255] = (255, 0, 0); overlay[mask2 == 255] = (0, 0, 255)
-                                        overlay_img_for_ui = overlay
-                                else: area_results = {"c1_pct": -1.0, "c1_cnt": -1, "c2_pct": -1.0, "c2_cnt": -1}
-
-                                if COLOR_ANALYSIS_ENABLED and colors_tab_open:
-                                    dominant_colors_for_ui = self._analyze_dominant_colors(area_np_rgb)
-
-                        except mss.ScreenShotError: pass
-                        except Exception as e:
-                            print(f"Worker Error (Area Grab/Calc): {e}"); traceback.print_exc()
-                            area_results = {"c1_pct": -2.0, "c1_cnt": -2, "c2_pct": -2.0, "c2_cnt": -2}
-
-                    self.update_queue.put({
-                        "type": "area_update", "results": area_results,
-                        "capture_img": capture_img_for_ui, "overlay_img": overlay_img_for_ui,
-                        "dominant_colors": dominant_colors_for_ui
-                    })
-
-                except Exception as loop_err:
-                    print(f"Critical Worker Error in loop: {loop_err}"); traceback.print_exc()
-                    self.update_queue.put({"type": "error", "message": str(loop_err)}); time.sleep(0.5)
-
-                elapsed = time.perf_counter() - start_time
-                sleep_duration = max(0, WORKER_SLEEP_TIME - elapsed)
-                if sleep_duration > 0:
-                    time.sleep(sleep_duration)
-
-        except Exception as thread_init_error:
-            print(f"Critical worker init error: {thread_init_error}"); traceback.print_exc()
-            self.update_queue.put({"type": "error", "message": f"Worker failed init: {thread_init_error}"})
-        finally:
-            if sct_worker: sct_worker.close(); print("Worker MSS closed.")
-            print("Processing loop stopped.")
-
-    def _colors_within_rgb_tolerance(self, rgb1, rgb2, tolerance):
-        if rgb1 is None or rgb2 is None: return False
-        try: return all(abs(int(c1) - int(c2)) <= tolerance for c1, c2 in zip(rgb1, rgb2))
-        except: return False
-
-    def _calculate_color_stats_lab(self, np_image_rgb, target_lab_np, tolerance):
-        if np_image_rgb is None or np_image_rgb.size == 0 or target_lab_np is None: return 0, 0, None
-        try:
-            if len(np_image_rgb.shape) != 3 or np_image_rgb.shape[2] != 3: return 0, 0, None
-            image_lab = cv2.cvtColor(np_image_rgb, cv2.COLOR_RGB2LAB)
-            delta_lab_sq = np.sum((image_lab.astype(np.float32) - target_lab_np.astype(np.float32))**2, axis=2)
-            mask = (delta_lab_sq <= float(tolerance)**2).astype(np.uint8) * 255
-            count = cv2.countNonZero(mask)
-            total = np_image_rgb.shape[0] * np_image_rgb.shape[1]
-            return (count / total) * 100 if total > 0 else 0, count, mask
-        except cv2.error as cv_err: print(f"OpenCV Error (LAB stats): {cv_err}"); return 0, 0, None
-        except Exception as e: print(f"Error (LAB stats): {e}"); traceback.print_exc(); return 0, 0, None
-
-    def _analyze_dominant_colors(self, np_image_rgb):
-        if np_image_rgb is None or np_image_rgb.size == 0: return []
-        try:
-            h, w = np_image_rgb.shape[:2]
-            scale = min(1.0, COLOR_ANALYSIS_RESIZE_WIDTH / w) if w > 0 else 1.0
-            resized_img = cv2.resize(np_image_rgb, None, fx=scale, fy=scale, interpolation=cv2.INTER_LINEAR) if scale < 1.0 else np_image_rgb
-            lab_img = cv2.cvtColor(resized_img, cv2.COLOR_RGB2LAB)
-            pixels = lab_img.reshape(-1, 3).astype(np.float32)
-            if len(pixels) < COLOR_ANALYSIS_K: return []
-
-            criteria = (cv2.TERM_CRITERIA_EPS + cv2.TERM_CRITERIA_MAX_ITER, 10, 1.0)
-            compactness, labels, centers = cv2.kmeans(pixels, COLOR_ANALYSIS_K, None, criteria, 10, cv2.KMEANS_PP_CENTERS)
-
-            label_counts = collections.Counter(labels.flatten()); total_pixels = len(pixels)
-            dominant_colors = []
-            for i, center_lab in enumerate(centers):
-                percentage = (label_counts[i] / total_pixels) * 100
-                if percentage >= COLOR_ANALYSIS_MIN_PERCENT:
-                    lab_tuple = tuple(map(int, center_lab))
-                    dominant_colors.append({'rgb': self._lab_to_rgb(lab_tuple), 'lab': lab_tuple, 'percentage': percentage})
-
-            return sorted(dominant_colors, key=lambda x: x['percentage'], reverse=True)
-        except cv2.error as cv_err: print(f"OpenCV Error (Dominant Colors): {cv_err}"); return []
-        except Exception as e: print(f"Error (Dominant Colors): {e}"); traceback.print_exc(); return []
+    def _toggle_recording(self):
+        self._set_config(recording_enabled=self.recording_enabled_var.get())
 
+    def _toggle_perf_export(self):
+        """Starts/stops the worker's stage timing export; a failure to start comes back in the next "worker_stats"."""
+        if self.perf_export_var.get() and self.perf_export_path is None:
+            self.perf_export_path = os.path.join(PERF_EXPORT_DIR, time.strftime(f"perf_%Y%m%d_%H%M%S.{PERF_EXPORT_FORMAT}"))
+            self.engine_handle.set_export(self.perf_export_path, PERF_EXPORT_FORMAT)
+        elif not self.perf_export_var.get() and self.perf_export_path is not None:
+            self.engine_handle.set_export(None)
+            self.perf_export_status_var.set(f"Last export: {self.perf_export_path}"); self.perf_export_path = None
 
     def _check_queue(self):
+        """Renders only the newest message of each type; anything the worker published in between is dropped."""
         try:
-            while not self.update_queue.empty():
-                self._process_queue_message(self.update_queue.get_nowait())
-        except queue.Empty: pass
+            for message in self.ui_slots.drain():
+                self._process_queue_message(message)
+            self.pipeline_stats_var.set(f"UI updates dropped: {self.ui_slots.dropped} / {self.ui_slots.published} | Match cache hits: {self.worker_stats.get('cache_hit_ratio', 0):.0%}")
         except Exception as e: print(f"Error processing queue: {e}"); traceback.print_exc()
         finally:
             if self.root.winfo_exists(): self.root.after(UI_UPDATE_INTERVAL, self._check_queue)
@@ -670,20 +614,32 @@ class ColorBotApp:
                 results = message.get("results", {})
                 c1p, c1c = results.get('c1_pct', 0), results.get('c1_cnt', 0)
                 c2p, c2c = results.get('c2_pct', 0), results.get('c2_cnt', 0)
-                stat_str = lambda p, c: f"Area: {p:.2f}% / {c} px"
+                approx = "~" if results.get('estimated') else ""
+                stat_str = lambda p, c: f"Area: {approx}{p:.2f}% / {approx}{c} px"
                 if c1p == -1.0: self.color1_value.set("Area: Invalid Target"); self.color2_value.set("Area: Invalid Target")
                 elif c1p == -2.0: self.color1_value.set("Area: Error"); self.color2_value.set("Area: Error")
                 else: self.color1_value.set(stat_str(c1p, c1c)); self.color2_value.set(stat_str(c2p, c2c))
 
-                self._update_image_preview(self.settings_capture_preview_label, message.get("capture_img"), self.preview_size)
-                self._update_image_preview(self.settings_overlay_preview_label, message.get("overlay_img"), self.preview_size)
-                self._update_image_preview(self.colors_capture_preview_label, message.get("capture_img"), self.colors_preview_size)
-                self._update_image_preview(self.colors_overlay_preview_label, message.get("overlay_img"), self.colors_preview_size)
+            elif msg_type == "preview":
+                self.latest_preview = message; self._render_previews()
 
-                dominant_colors = message.get("dominant_colors", [])
+            elif msg_type == "dominant_colors":
+                dominant_colors = message.get("colors", [])
                 if dominant_colors:
                      self._update_color_treeview(dominant_colors)
 
+            elif msg_type == "worker_stats":
+                self.worker_stats = message
+                export_error = message.get("export_error")
+                if self.perf_export_path and export_error and export_error.startswith(self.perf_export_path):
+                    self.perf_export_path = None; self.perf_export_var.set(False)
+                    messagebox.showwarning("Export Error", f"Could not start timing export:\n{export_error}")
+
+            elif msg_type == "recording_failed":
+                self._set_config(recording_enabled=False); self.recording_enabled_var.set(False)
+                print(f"Worker Recording Error Reported: {message.get('message')}")
+                self.status_var.set("Recording Error"); self.status_value_label.config(foreground="orange")
+
             elif msg_type == "error":
                 print(f"Worker Thread Error Reported: {message.get('message', 'Unknown worker error')}")
                 self.status_var.set("Worker Error"); self.status_value_label.config(foreground="orange")
@@ -691,36 +647,22 @@ class ColorBotApp:
         except tk.TclError as e: print(f"TclError updating UI (Window closed?): {e}")
         except Exception as e: print(f"Error updating UI from queue: {e}"); traceback.print_exc()
 
-    def _update_image_preview(self, label_widget, np_image, target_size):
-        if not hasattr(label_widget, 'winfo_exists') or not label_widget.winfo_exists(): return
-        if np_image is None or np_image.size == 0:
-            label_widget.config(image='', width=target_size[0], height=target_size[1]); label_widget.image = None; return
+    def _render_previews(self):
+        """Draws the latest preview into the selected tab's panels only; another tab catches up when it is selected."""
+        if self.latest_preview is None: return
+        panels = self.preview_panels.get(self.notebook.index(self.notebook.select()))
+        if not panels: return
         try:
-            img_pil = Image.fromarray(np_image).copy()
-            img_pil.thumbnail(target_size, Image.Resampling.LANCZOS)
-            img_tk = ImageTk.PhotoImage(img_pil)
-            label_widget.config(image=img_tk, width=img_tk.width(), height=img_tk.height()); label_widget.image = img_tk
+            for panel, name in zip(panels, ("capture_img", "overlay_img")): panel.show(name, self.latest_preview.get(name))
         except tk.TclError: pass
-        except Exception as e: print(f"Error updating preview: {e}"); label_widget.config(image=''); label_widget.image = None
+        except Exception as e:
+            print(f"Error updating preview: {e}")
+            for panel in panels: panel.clear()
 
     def _update_color_treeview(self, dominant_colors):
+        """Diffs the list into the fixed row pool; called at most once per queue drain (UI_UPDATE_INTERVAL) with the newest list."""
         if not hasattr(self, 'color_tree') or not self.color_tree.winfo_exists(): return
-        try:
-            self.color_tree.delete(*self.color_tree.get_children())
-            for i, color_data in enumerate(dominant_colors):
-                rgb, lab, percent = color_data['rgb'], color_data['lab'], color_data['percentage']
-                hex_color = f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
-                tag_name = f"color_{i}"
-                luminance = (0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2]) / 255
-                text_color = "black" if luminance > 0.5 else "white"
-                self.color_tree.tag_configure(tag_name, background=hex_color, foreground=text_color)
-
-                self.color_tree.insert('', tk.END, values=(
-                    '███',
-                    f"{rgb[0]}, {rgb[1]}, {rgb[2]}",
-                    f"{lab[0]}, {lab[1]}, {lab[2]}",
-                    f"{percent:.1f}%"
-                ), tags=(tag_name,))
+        try: self.color_rows.update(dominant_colors)
         except tk.TclError: pass
         except Exception as e: print(f"Error updating color treeview: {e}"); traceback.print_exc()
 
@@ -738,12 +680,10 @@ class ColorBotApp:
                 x, y = pyautogui.position()
                 self.mouse_coords_var.set(f"X: {x}, Y: {y}")
 
-                pixel_dict = {"left": x, "top": y, "width": 1, "height": 1}
-                sct_img = self.sct_main.grab(pixel_dict)
-                np_rgb = cv2.cvtColor(np.array(sct_img), cv2.COLOR_BGRA2RGB)
+                np_bgra = self.ui_capture.grab(x, y, 1, 1)
 
-                if np_rgb.size > 0:
-                    rgb = tuple(np_rgb[0, 0])
+                if np_bgra.size > 0:
+                    rgb = tuple(int(c) for c in np_bgra[0, 0, 2::-1])
                     lab = self._rgb_to_lab(rgb)
                     hex_color = f'#{rgb[0]:02x}{rgb[1]:02x}{rgb[2]:02x}'
 
@@ -753,7 +693,7 @@ class ColorBotApp:
                          self.mouse_swatch_label.config(bg=hex_color)
                 else: raise Exception("Grabbed empty image")
 
-            except (mss.ScreenShotError, pyautogui.FailSafeException):
+            except (CaptureError, pyautogui.FailSafeException):
                 self.mouse_rgb_var.set("---, ---, ---"); self.mouse_lab_var.set("---, ---, ---")
                 if hasattr(self, 'mouse_swatch_label') and self.mouse_swatch_label.winfo_exists(): self.mouse_swatch_label.config(bg="black")
             except Exception as e:
@@ -772,8 +712,29 @@ class ColorBotApp:
             self.root.after(MOUSE_PIXEL_POLL_INTERVAL, self._update_mouse_pixel_info)
 
 
+    def _update_perf_tab(self):
+        """Refreshes the Performance tab from the stage rings while it is the selected tab."""
+        try:
+            if self.notebook.index(self.notebook.select()) == 2:
+                stats = self.worker_stats
+                self.perf_rate_var.set(f"Achieved: {stats.get('rate', 0):.0f} ticks/s (target {self.target_tick_rate}, {ENGINE_MODE})")
+                self.perf_queue_var.set(f"Queue depth: UI {self.ui_slots.pending()} pending, {self.ui_slots.dropped} dropped | "
+                                        f"Analysis {stats.get('analysis_pending', 0)} pending, {stats.get('analysis_dropped', 0)} dropped | Match cache hits: {stats.get('cache_hit_ratio', 0):.0%}")
+                export = stats.get("export")
+                if export and self.perf_export_path: self.perf_export_status_var.set(f"{export['path']}: {export['exported']} samples, {export['lost']} lost")
+                for stage, s in stats.get("perf", {}).items():
+                    peak = max(s["histogram"]) or 1
+                    bars = "".join(PERF_HISTOGRAM_BARS[-(-c * (len(PERF_HISTOGRAM_BARS) - 1) // peak)] for c in s["histogram"])
+                    values = (stage, s["total"], f"{s['mean_ms']:.3f}", f"{s['p50_ms']:.3f}", f"{s['p99_ms']:.3f}", f"{s['max_ms']:.3f}", bars)
+                    if self.perf_tree.exists(stage): self.perf_tree.item(stage, values=values)
+                    else: self.perf_tree.insert('', tk.END, iid=stage, values=values)
+        except tk.TclError: pass
+        except Exception as e: print(f"Error updating performance tab: {e}"); traceback.print_exc()
+        if self.root.winfo_exists() and not self.stop_event.is_set():
+            self.root.after(PERF_UPDATE_INTERVAL, self._update_perf_tab)
+
     def _toggle_script(self):
-        with self.config_lock: self.is_paused = not self.is_paused
+        with self.config_lock: self._set_config(is_paused=not self.is_paused)
         self._update_status_ui()
         print(f"Script {'Paused' if self.is_paused else 'Running'}")
 
@@ -781,7 +742,7 @@ class ColorBotApp:
         """ Toggles clicking enabled state via checkbutton or hotkey. """
         new_state = False
         with self.config_lock:
-            self.clicking_enabled = not self.clicking_enabled
+            self._set_config(clicking_enabled=not self.clicking_enabled)
             new_state = self.clicking_enabled
 
         if hasattr(self, 'clicking_enabled_var'):
@@ -794,14 +755,49 @@ class ColorBotApp:
 
 
     def _on_tab_changed(self, event):
-        """Update the flag indicating if the 'Detected Colors' tab is active."""
+        """Update the flags for the 'Detected Colors' tab being active and for a preview panel being on screen."""
         try:
             selected_tab_index = self.notebook.index(self.notebook.select())
             is_colors_tab = (selected_tab_index == 1)
-            with self.config_lock: self.detected_colors_tab_active = is_colors_tab
+            self._set_config(detected_colors_tab_active=is_colors_tab, preview_visible=selected_tab_index in self.preview_panels)
+            self._render_previews()
         except tk.TclError: pass
         except Exception as e: print(f"Error checking active tab: {e}")
 
+    def _on_root_visibility(self, event, visible):
+        """Area stats and previews are only computed while the main window is shown (not minimized)."""
+        if event.widget is not self.root: return
+        self._set_config(area_stats_needed=visible)
+
+    def _schedule_window_refresh(self, event=None):
+        # Child widgets deliver their own Configure/Focus events here too; coalesce a burst into one refresh.
+        if not self.window_refresh_pending:
+            self.window_refresh_pending = True; self.root.after_idle(self._refresh_window_state)
+
+    def _refresh_window_state(self):
+        """Publishes the main window's focus and outer rectangle (title bar and borders included) to the worker."""
+        self.window_refresh_pending = False
+        try:
+            if not self.root.winfo_exists(): return
+            try: focus_widget = self.root.focus_get()
+            except (KeyError, tk.TclError): focus_widget = None
+            focused = focus_widget is not None and focus_widget.winfo_toplevel() is self.root
+            frame_x, frame_y, client_x, client_y = self.root.winfo_x(), self.root.winfo_y(), self.root.winfo_rootx(), self.root.winfo_rooty()
+            border = max(0, client_x - frame_x)
+            width, height = self.root.winfo_width() + 2 * border, self.root.winfo_height() + (client_y - frame_y) + border
+            self.window_tracker.update(focused, frame_x, frame_y, width, height)
+            # Only changes cross to the engine (a pipe message when it runs in a process).
+            if self.engine_handle and self.window_tracker.updates != self.window_updates_sent:
+                self.engine_handle.update_window(self.window_tracker.state); self.window_updates_sent = self.window_tracker.updates
+        except tk.TclError: pass
+        except Exception as e: print(f"Error refreshing window state: {e}")
+
+    def _poll_window_state(self):
+        """Slow fallback for changes Tk reports no event for (e.g. another app's window taking focus without a FocusOut)."""
+        self._refresh_window_state()
+        if self.root.winfo_exists() and not self.stop_event.is_set():
+            self.root.after(WINDOW_REFRESH_INTERVAL, self._poll_window_state)
+
     def _update_status_ui(self):
          status_text = "Paused" if self.is_paused else "Running"
          status_color = "red" if self.is_paused else "lime green"
@@ -890,16 +886,19 @@ class ColorBotApp:
 
 
     def _start_worker(self):
-        if self.worker_thread is None or not self.worker_thread.is_alive():
+        if self.engine_handle is None:
             self.stop_event.clear()
-            self.worker_thread = threading.Thread(target=self._processing_loop, daemon=True)
-            self.worker_thread.start(); print("Worker thread started.")
+            analyzer_options = {"k": COLOR_ANALYSIS_K, "resize_width": COLOR_ANALYSIS_RESIZE_WIDTH, "min_percent": COLOR_ANALYSIS_MIN_PERCENT, "mode": self.color_analysis_mode}
+            self.engine_handle = start_engine(ENGINE_MODE, self.ui_slots.publish, self.worker_config, capture_backend=CAPTURE_BACKEND, capture_options=CAPTURE_OPTIONS,
+                                              analyzer_options=analyzer_options, click_cooldown=CLICK_COOLDOWN, preview_interval=UI_UPDATE_INTERVAL / 1000,
+                                              recordings_dir=RECORDINGS_DIR, analysis_enabled=COLOR_ANALYSIS_ENABLED)
+            self._refresh_window_state()
 
     def _save_config(self):
         with self.config_lock:
             config = {k: getattr(self, k) for k in [
                 "color1_rgb", "color2_rgb", "area_tolerance", "capture_box_size",
-                "click_method", "click_button", "clicking_enabled",
+                "click_method", "click_button", "clicking_enabled", "target_tick_rate", "color_analysis_mode",
                 "pause_hotkey_str", "toggle_click_hotkey_str" ]}
             config["pause_hotkey"] = config.pop("pause_hotkey_str")
             config["toggle_click_hotkey"] = config.pop("toggle_click_hotkey_str")
@@ -913,7 +912,8 @@ class ColorBotApp:
             "color1_rgb": (204, 204, 204), "color2_rgb": (38, 120, 122),
             "area_tolerance": DEFAULT_AREA_TOLERANCE, "capture_box_size": DEFAULT_CAPTURE_BOX_SIZE,
             "click_method": DEFAULT_CLICK_METHOD, "click_button": DEFAULT_CLICK_BUTTON,
-            "clicking_enabled": DEFAULT_CLICKING_ENABLED,
+            "clicking_enabled": DEFAULT_CLICKING_ENABLED, "target_tick_rate": DEFAULT_TARGET_TICK_RATE,
+            "color_analysis_mode": DEFAULT_COLOR_ANALYSIS_MODE,
             "pause_hotkey": DEFAULT_PAUSE_HOTKEY, "toggle_click_hotkey": DEFAULT_TOGGLE_CLICK_HOTKEY }
         cfg = defaults.copy()
         if os.path.exists(CONFIG_FILE):
@@ -928,15 +928,16 @@ class ColorBotApp:
             self.color2_rgb = tuple(cfg["color2_rgb"]) if isinstance(cfg["color2_rgb"], list) else defaults["color2_rgb"]
             self.area_tolerance = int(cfg["area_tolerance"])
             self.capture_box_size = int(cfg["capture_box_size"])
-            self.click_method = cfg["click_method"]
+            self.click_method = cfg["click_method"] if cfg["click_method"] in CLICK_METHODS else DEFAULT_CLICK_METHOD
             self.click_button = cfg["click_button"]
             self.clicking_enabled = bool(cfg["clicking_enabled"])
+            self.target_tick_rate = max(1, int(cfg["target_tick_rate"]))
+            self.color_analysis_mode = cfg["color_analysis_mode"] if cfg["color_analysis_mode"] in COLOR_ANALYSIS_MODES else DEFAULT_COLOR_ANALYSIS_MODE
             self.pause_hotkey_str = cfg["pause_hotkey"]
             self.toggle_click_hotkey_str = cfg["toggle_click_hotkey"]
-            self.color1_lab = self._rgb_to_lab(self.color1_rgb)
-            self.color2_lab = self._rgb_to_lab(self.color2_rgb)
+            self.worker_config = self._build_worker_config(self.worker_config.version + 1)
 
-        print(f"Initial Settings: Click={self.clicking_enabled}, Pause='{self.pause_hotkey_str}', ToggleClick='{self.toggle_click_hotkey_str}'")
+        print(f"Initial Settings: Click={self.clicking_enabled}, TickRate={self.target_tick_rate}Hz, Pause='{self.pause_hotkey_str}', ToggleClick='{self.toggle_click_hotkey_str}'")
         self._update_ui_from_config()
         self._register_hotkeys()
 
@@ -953,6 +954,7 @@ class ColorBotApp:
 
             self.clicking_enabled_var.set(self.clicking_enabled)
             self.click_method_var.set(self.click_method); self.click_button_var.set(self.click_button)
+            self.color_analysis_mode_var.set(self.color_analysis_mode)
 
             self.pause_hotkey_label.config(text=self.pause_hotkey_str)
             self.toggle_click_hotkey_label.config(text=self.toggle_click_hotkey_str)
@@ -968,12 +970,10 @@ class ColorBotApp:
         self.stop_event.set()
         self._unregister_hotkeys()
 
-        if self.worker_thread and self.worker_thread.is_alive():
-            print("Waiting for worker thread..."); self.worker_thread.join(timeout=0.5)
-            if self.worker_thread.is_alive(): print("Worker thread join timed out.")
+        if self.engine_handle: self.engine_handle.stop(); self.engine_handle = None
 
-        if self.sct_main: 
-            try: self.sct_main.close(); print("Main MSS closed.") 
+        if self.ui_capture:
+            try: self.ui_capture.close(); print("Main MSS closed.")
             except Exception as e: print(f"Error closing main MSS: {e}")
 
 
@@ -0,0 +1,69 @@
+"""MaskKernel's integer LAB and RGB masks against the float formulation they replaced."""
+import numpy as np
+import pytest
+
+from colorbot import Target
+from colorbot.colorspace import bgr_to_lab_array, rgb_to_lab_array
+from colorbot.lut import MaskKernel
+
+LAYOUTS = [("RGB", 3), ("BGR", 3), ("BGR", 4)]  # BGRA is the capture layout
+EDGE_TOLERANCES = (0, 1, 100, 255)
+
+
+def float_mask(np_image, image_lab, target, order):
+    if target.metric == "LAB":
+        return np.sum((image_lab.astype(np.float32) - np.array(target.lab, dtype=np.float32)) ** 2, axis=2) <= target.tolerance ** 2
+    target_rgb = target.rgb[::-1] if order == "BGR" else target.rgb
+    return np.all(np.abs(np_image[..., :3].astype(np.int16) - np.array(target_rgb, dtype=np.int16)) <= target.tolerance, axis=2)
+
+
+def image_with_target(rng, shape, rgb, order, channels):
+    """Random image with ``rgb`` planted in its first rows and in pixels one step either side of it."""
+    image = rng.integers(0, 256, shape + (channels,), dtype=np.uint8)
+    pixel = np.array(rgb[::-1] if order == "BGR" else rgb)
+    image[: shape[0] // 4, :, :3] = pixel
+    flat = image.reshape(-1, channels)
+    flat[len(flat) // 2, :3], flat[-1, :3] = np.clip(pixel + 1, 0, 255), np.clip(pixel - 1, 0, 255)
+    return image
+
+
+def lab_of(image, order):
+    return bgr_to_lab_array(image) if order == "BGR" else rgb_to_lab_array(image)
+
+
+@pytest.mark.parametrize("order,channels", LAYOUTS)
+@pytest.mark.parametrize("metric", ["LAB", "RGB"])
+@pytest.mark.parametrize("tolerance", EDGE_TOLERANCES + (7, 42))
+def test_mask_equals_float_reference(order, channels, metric, tolerance):
+    rng = np.random.default_rng(tolerance)
+    kernel = MaskKernel()
+    for shape in [(1, 1), (2, 2), (1, 5), (37, 61), (120, 80)]:
+        rgb = tuple(int(c) for c in rng.integers(0, 256, 3))
+        image = image_with_target(rng, shape, rgb, order, channels)
+        image_lab = lab_of(image, order)
+        target = Target(rgb, tolerance, metric)
+        expected = float_mask(image, image_lab, target, order)
+        np.testing.assert_array_equal(kernel.mask(image, image_lab, target, order) != 0, expected)
+
+
+@pytest.mark.parametrize("order,channels", LAYOUTS)
+@pytest.mark.parametrize("tolerance", EDGE_TOLERANCES)
+def test_rgb_tolerance_edge(order, channels, tolerance):
+    """A channel exactly ``tolerance`` away matches, one further does not."""
+    for base, step in ((0, 1), (255, -1)):
+        values = [base + step * tolerance, base + step * (tolerance + 1)]
+        pixels = [(v, 128, 128) for v in values if 0 <= v <= 255]
+        image = np.zeros((1, len(pixels), channels), dtype=np.uint8)
+        image[0, :, :3] = [p[::-1] if order == "BGR" else p for p in pixels]
+        mask = MaskKernel().mask(image, lab_of(image, order), Target((base, 128, 128), tolerance, "RGB"), order) != 0
+        assert mask.tolist()[0] == [True, False][:len(pixels)]
+
+
+@pytest.mark.parametrize("tolerance", (0, 1, 100))
+def test_lab_tolerance_edge(tolerance):
+    """LAB pixels at squared distance tolerance² match, at tolerance² + 1 they do not."""
+    target = Target((128, 128, 128), tolerance, "LAB")
+    offsets = [(tolerance, 0, 0), (0, -tolerance, 0), (0, 0, tolerance), (tolerance, 1, 0), (0, -tolerance, -1), (1, 0, tolerance)]
+    image_lab = (np.array(target.lab, dtype=np.int32) + np.array(offsets)).astype(np.uint8).reshape(1, -1, 3)
+    mask = MaskKernel().mask(np.zeros_like(image_lab), image_lab, target) != 0
+    assert mask.tolist()[0] == [True] * 3 + [False] * 3